@@ -0,0 +1,94 @@
+"""Модуль аутентификации по JWT с кешем пользователей в памяти процесса."""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserSnapshotCache:
+    """LRU-кеш с TTL для снимков строк пользователей.
+
+    Хранит значения полей, а не сами объекты: каждому запросу
+    достается свежий экземпляр, изменения которого не утекают в кеш.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, snapshot = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key, snapshot):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Удаляет все снимки пользователя, под любыми токенами."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserSnapshotCache(
+    max_size=settings.JWT_USER_CACHE_SIZE, ttl=settings.JWT_USER_CACHE_TTL
+)
+
+
+def make_snapshot(user):
+    """Значения полей пользователя для кеша."""
+    fields = user._meta.concrete_fields
+    return (
+        user._state.db,
+        [field.attname for field in fields],
+        [getattr(user, field.attname) for field in fields],
+    )
+
+
+def restore_snapshot(snapshot):
+    """Новый экземпляр пользователя, как будто загруженный из базы."""
+    db, field_names, values = snapshot
+    return get_user_model().from_db(db, field_names, values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая не читает пользователя из базы повторно.
+
+    Снимок кешируется по id пользователя и jti токена и сбрасывается
+    при сохранении или удалении пользователя в этом процессе; в других
+    процессах он живет не дольше JWT_USER_CACHE_TTL секунд.
+    """
+
+    def get_user(self, validated_token):
+        key = (
+            validated_token.get(api_settings.USER_ID_CLAIM),
+            validated_token.get(api_settings.JTI_CLAIM),
+        )
+        snapshot = user_cache.get(key)
+        if snapshot is None:
+            user = super().get_user(validated_token)
+            user_cache.set(key, make_snapshot(user))
+            return user
+        return restore_snapshot(snapshot)
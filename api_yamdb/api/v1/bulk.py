@@ -0,0 +1,273 @@
+"""
+Модуль пакетного создания объектов через API.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.db.models import AutoField
+from django.utils.encoding import smart_str
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import ListSerializer, SlugRelatedField
+from rest_framework.settings import api_settings
+from reviews.models import GenreTitle, Review, Title
+from reviews.rankings import replace_rankings
+from reviews.signals import apply_rating_delta
+
+from .cache import bump_generation
+
+PREFETCHED_KEY = "prefetched_related"
+
+
+def bulk_insert(model, objs, unique_fields=()):
+    """
+    bulk_create пачками, допустимыми для бэкенда.
+
+    С unique_fields у всех объектов заполняется первичный ключ. Бэкенды
+    без RETURNING (SQLite) не отдают ключи вставленных строк, и строки
+    находятся повторно по этому уникальному набору полей.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    batch_size = max(
+        min(
+            settings.API_BULK_BATCH_SIZE,
+            connection.ops.bulk_batch_size(fields, objs),
+        ),
+        1,
+    )
+    model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+    can_return_ids = connection.features.can_return_ids_from_bulk_insert
+    if unique_fields and not can_return_ids:
+        fetch_pks(model, objs, unique_fields, using)
+    return objs
+
+
+def fetch_pks(model, objs, unique_fields, using):
+    """Заполняет первичные ключи объектов, находя строки по unique_fields."""
+    attnames = [model._meta.get_field(name).attname for name in unique_fields]
+    by_key = {
+        tuple(getattr(obj, attname) for attname in attnames): obj
+        for obj in objs
+    }
+    batch_size = max(
+        connections[using].ops.bulk_batch_size(attnames, objs), 1
+    )
+    keys = list(by_key)
+    for start in range(0, len(keys), batch_size):
+        chunk = keys[start:start + batch_size]
+        lookup = {
+            f"{attname}__in": {key[position] for key in chunk}
+            for position, attname in enumerate(attnames)
+        }
+        rows = (
+            model.objects.using(using)
+            .filter(**lookup)
+            .order_by()
+            .values_list("pk", *attnames)
+        )
+        for pk, *key in rows:
+            obj = by_key.get(tuple(key))
+            if obj is not None:
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = using
+
+
+class PrefetchedSlugRelatedField(SlugRelatedField):
+    """
+    SlugRelatedField, берущий объекты из предзагрузки пакета.
+
+    Вне пакета ведет себя как обычный SlugRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get(PREFETCHED_KEY, {}).get(
+            (self.get_queryset().model, self.slug_field)
+        )
+        if prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            return prefetched[smart_str(data)]
+        except KeyError:
+            self.fail(
+                "does_not_exist",
+                slug_name=self.slug_field,
+                value=smart_str(data),
+            )
+
+
+class BulkCreateListSerializer(ListSerializer):
+    """
+    Список, проверяемый и сохраняемый одним пакетом.
+
+    Связанные объекты для всех элементов загружаются одним запросом на
+    поле, ошибки возвращаются списком по позициям элементов.
+    """
+
+    def prefetched_fields(self):
+        """Пары (имя поля, поле-связь) с предзагрузкой."""
+        for name, field in self.child.fields.items():
+            if field.read_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                relation = field.child_relation
+            else:
+                relation = field
+            if isinstance(relation, PrefetchedSlugRelatedField):
+                yield name, relation
+
+    def prefetch_related_values(self, data):
+        """Загружает связанные объекты, упомянутые в элементах пакета."""
+        prefetched = {}
+        for name, relation in self.prefetched_fields():
+            queryset = relation.get_queryset()
+            model_field = queryset.model._meta.get_field(relation.slug_field)
+            values = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value is None:
+                    continue
+                for raw in value if isinstance(value, list) else [value]:
+                    try:
+                        values.add(model_field.to_python(raw))
+                    except (DjangoValidationError, TypeError):
+                        continue
+            lookup = {f"{relation.slug_field}__in": values}
+            prefetched[(queryset.model, relation.slug_field)] = {
+                smart_str(getattr(obj, relation.slug_field)): obj
+                for obj in queryset.filter(**lookup).order_by()
+            }
+        self._context[PREFETCHED_KEY] = prefetched
+
+    def validate_items(self, items):
+        """Проверки между элементами пакета: список ошибок по позициям."""
+        return []
+
+    def to_internal_value(self, data):
+        """Проверяет пакет после предзагрузки связанных объектов."""
+        max_items = settings.API_BULK_MAX_ITEMS
+        if isinstance(data, list) and len(data) > max_items:
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"Не больше {max_items} объектов за запрос."
+                    ]
+                }
+            )
+        if isinstance(data, list):
+            self.prefetch_related_values(data)
+        items = super().to_internal_value(data)
+        errors = self.validate_items(items)
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+
+class TitleListSerializer(BulkCreateListSerializer):
+    """Пакетное создание произведений вместе со связями с жанрами."""
+
+    def validate_items(self, items):
+        """Отклоняет повтор названия в категории (unique_name_category)."""
+        existing = set(
+            Title.objects.filter(
+                name__in={item["name"] for item in items},
+                category__in={item["category"] for item in items},
+            )
+            .order_by()
+            .values_list("name", "category_id")
+        )
+        errors = []
+        seen = set()
+        for item in items:
+            key = (item["name"], item["category"].pk)
+            if key in existing or key in seen:
+                errors.append(
+                    {
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            "Произведение с таким названием уже есть "
+                            "в этой категории."
+                        ]
+                    }
+                )
+            else:
+                errors.append({})
+            seen.add(key)
+        return errors
+
+    def create(self, validated_data):
+        titles = []
+        genres = []
+        for item in validated_data:
+            item = dict(item)
+            genres.append(list(dict.fromkeys(item.pop("genre", []))))
+            titles.append(Title(**item))
+        with transaction.atomic():
+            bulk_insert(Title, titles, unique_fields=("name", "category"))
+            bulk_insert(
+                GenreTitle,
+                [
+                    GenreTitle(title=title, genre=genre)
+                    for title, title_genres in zip(titles, genres)
+                    for genre in title_genres
+                ],
+            )
+        bump_generation("title", "genretitle")
+        return titles
+
+
+class ReviewListSerializer(BulkCreateListSerializer):
+    """Пакетный импорт отзывов с пересчетом рейтинга по произведениям."""
+
+    def validate_items(self, items):
+        """Отклоняет повторные отзывы автора на произведение."""
+        pairs = {(item["author"].pk, item["title"].pk) for item in items}
+        existing = set(
+            Review.objects.filter(
+                author__in={author for author, _ in pairs},
+                title__in={title for _, title in pairs},
+            )
+            .order_by()
+            .values_list("author_id", "title_id")
+        )
+        errors = []
+        seen = set()
+        for item in items:
+            pair = (item["author"].pk, item["title"].pk)
+            if pair in existing or pair in seen:
+                errors.append(
+                    {
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            "Невозможно оставить больше одного отзыва "
+                            "на произведение!"
+                        ]
+                    }
+                )
+            else:
+                errors.append({})
+            seen.add(pair)
+        return errors
+
+    def create(self, validated_data):
+        reviews = [Review(**item) for item in validated_data]
+        deltas = defaultdict(lambda: [0, 0])
+        for review in reviews:
+            deltas[review.title_id][0] += review.score
+            deltas[review.title_id][1] += 1
+        with transaction.atomic():
+            bulk_insert(
+                Review, reviews, unique_fields=("title", "author")
+            )
+            for title_id, (score_delta, count_delta) in deltas.items():
+                apply_rating_delta(title_id, score_delta, count_delta)
+            replace_rankings(list(deltas))
+        bump_generation("review", "title")
+        return reviews
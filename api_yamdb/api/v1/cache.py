@@ -0,0 +1,200 @@
+"""Модуль кеширования ответов каталога.
+
+Ключ ответа строится из нормализованного адреса, отсортированных
+параметров запроса и поколений ресурсов, от которых зависит выдача.
+Изменение модели увеличивает поколение ресурса, и старые ключи просто
+перестают использоваться, дожидаясь вытеснения по TIMEOUT.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from core.compression import compress_variants, is_compressible
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+GENERATION_KEY = "api:generation:{}"
+MODIFIED_KEY = "api:modified:{}"
+RESPONSE_KEY = "api:response:{}"
+COMPRESSED_KEY = "api:compressed:{}"
+
+
+def get_cache():
+    """Возвращает бэкенд кеша, выбранный для API."""
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _initial_generation():
+    """Начальное поколение, которое не совпадет с вытесненным ранее."""
+    return int(time.time() * 1000)
+
+
+def get_versions(resources):
+    """Возвращает поколения ресурсов и время последнего изменения.
+
+    Поколения идут в порядке перечисления ресурсов, время изменения
+    берется максимальным по всем ресурсам (unix timestamp).
+    """
+    cache = get_cache()
+    keys = [GENERATION_KEY.format(resource) for resource in resources]
+    keys += [MODIFIED_KEY.format(resource) for resource in resources]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            initial = _initial_generation()
+            cache.add(key, initial, None)
+            # Кеш, не хранящий значений (DummyCache), каждый раз отдает
+            # новое поколение: ответы просто не кешируются.
+            values[key] = cache.get(key, initial)
+    generations = [
+        values[GENERATION_KEY.format(resource)] for resource in resources
+    ]
+    modified = [
+        values[MODIFIED_KEY.format(resource)] for resource in resources
+    ]
+    return generations, max(modified, default=0) // 1000
+
+
+def bump_generation(*resources):
+    """Инвалидирует закешированные ответы, зависящие от ресурсов.
+
+    Внутри транзакции поколения увеличиваются после ее фиксации: иначе
+    параллельное чтение успело бы закешировать данные до коммита под
+    новым поколением, и они жили бы в кеше до TIMEOUT.
+    """
+    transaction.on_commit(lambda: _bump_generation(resources))
+
+
+def _bump_generation(resources):
+    cache = get_cache()
+    now = _initial_generation()
+    for resource in resources:
+        key = GENERATION_KEY.format(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, now, None)
+        cache.set(MODIFIED_KEY.format(resource), now, None)
+
+
+class ResourceVersionMixin:
+    """Отпечаток выдачи по запросу и версиям ресурсов, без рендеринга."""
+
+    cache_dependencies = ()
+    # Пользователь после своей записи читает основную базу (ReplicaReadMixin).
+    # Ответ из кеша или 304 могли быть построены по отстающей реплике под
+    # уже новым поколением, поэтому такие запросы их не получают.
+    primary_pinned = False
+
+    def get_request_fingerprint(self, request):
+        """Хеш адреса, параметров, формата ответа и поколений ресурсов."""
+        if getattr(self, "request_fingerprint", None) is None:
+            params = sorted(
+                (name, value)
+                for name, values in request.query_params.lists()
+                for value in values
+                if value != ""
+            )
+            generations, self.resources_modified = get_versions(
+                self.cache_dependencies
+            )
+            parts = [
+                request.build_absolute_uri(request.path),
+                urlencode(params),
+                request.accepted_media_type,
+            ]
+            parts.extend(str(generation) for generation in generations)
+            self.request_fingerprint = hashlib.md5(
+                "|".join(parts).encode()
+            ).hexdigest()
+        return self.request_fingerprint
+
+    def get_last_modified(self, request):
+        """Время последнего изменения ресурсов, от которых зависит ответ."""
+        self.get_request_fingerprint(request)
+        return self.resources_modified
+
+
+class CachedResponseMixin(ResourceVersionMixin):
+    """Кеширует отрендеренные ответы безопасных запросов к каталогу.
+
+    Рядом с ответом хранятся его сжатые варианты: каждый ответ сжимается
+    один раз при записи, а не на каждом попадании в кеш.
+    """
+
+    cache_actions = ("list", "retrieve")
+
+    def is_cacheable_request(self, request):
+        """Кешируются только GET/HEAD вне браузерного представления API."""
+        return (
+            request.method in ("GET", "HEAD")
+            and self.action in self.cache_actions
+            and request.accepted_renderer.format != "api"
+        )
+
+    def get_cache_key(self, request):
+        """Ключ из пути, параметров запроса и поколений зависимостей."""
+        return RESPONSE_KEY.format(self.get_request_fingerprint(request))
+
+    def get_cached_response(self, request):
+        """Возвращает ответ из кеша или None, запоминая ключ для записи.
+
+        Ответ закрепленного за основной базой пользователя не берется из
+        кеша, но записывается в него, заменяя возможную версию с реплики.
+        """
+        self.response_cache_key = None
+        if not self.is_cacheable_request(request):
+            return None
+        self.response_cache_key = self.get_cache_key(request)
+        if self.primary_pinned:
+            return None
+        compressed_key = COMPRESSED_KEY.format(self.response_cache_key)
+        cached = get_cache().get_many(
+            [self.response_cache_key, compressed_key]
+        )
+        if self.response_cache_key not in cached:
+            return None
+        content, content_type = cached[self.response_cache_key]
+        response = HttpResponse(content, content_type=content_type)
+        if compressed_key in cached:
+            response.compressed_variants = cached[compressed_key]
+        response["X-Cache"] = "HIT"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(self, "response_cache_key", None)
+        if (
+            key
+            and isinstance(response, Response)
+            and response.status_code == 200
+        ):
+            response.render()
+            entries = {key: (response.content, response["Content-Type"])}
+            if is_compressible(response):
+                response.compressed_variants = compress_variants(
+                    response.content
+                )
+                entries[COMPRESSED_KEY.format(key)] = (
+                    response.compressed_variants
+                )
+            get_cache().set_many(entries)
+            response["X-Cache"] = "MISS"
+        return response
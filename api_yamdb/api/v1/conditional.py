@@ -0,0 +1,149 @@
+"""Модуль условных запросов: ETag, Last-Modified и If-Match.
+
+Валидаторы каталога считаются по версиям ресурсов из кеша, поэтому
+ответ 304 отдается до выборки из базы и работы сериализаторов.
+"""
+import hashlib
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import ResourceVersionMixin
+
+
+def if_match_passes(etag, header):
+    """Сравнение If-Match; W/ от сжатого ответа не мешает совпадению."""
+    etags = parse_etags(header)
+    return etags == ["*"] or etag in (
+        tag[2:] if tag.startswith("W/") else tag for tag in etags
+    )
+
+
+class PreconditionFailed(APIException):
+    """Ресурс изменился после того, как клиент получил его ETag."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _("Ресурс был изменен другим запросом.")
+    default_code = "precondition_failed"
+
+
+class ConditionalGetMixin(ResourceVersionMixin):
+    """Отвечает 304 на If-None-Match/If-Modified-Since для чтения."""
+
+    conditional_actions = ("list", "retrieve")
+
+    def get_conditional_validators(self, request):
+        """ETag и Last-Modified ответа, если действие их поддерживает."""
+        if (
+            request.method not in ("GET", "HEAD")
+            or self.action not in self.conditional_actions
+        ):
+            return None, None
+        etag = quote_etag(self.get_request_fingerprint(request))
+        return etag, self.get_last_modified(request)
+
+    def get_not_modified_response(self, request):
+        """Возвращает 304, если у клиента актуальная версия ответа."""
+        etag, last_modified = self.get_conditional_validators(request)
+        if etag is None or self.primary_pinned:
+            return None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if response.status_code == status.HTTP_200_OK:
+            etag, last_modified = self.get_conditional_validators(request)
+            if etag is not None:
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class ConditionalObjectMixin:
+    """ETag отдельного объекта и проверка If-Match при его изменении.
+
+    Проверка идет под блокировкой строки, чтобы два запроса с одним
+    ETag не могли оба изменить объект. Слабый ETag, полученный в сжатом
+    ответе, принимается наравне с сильным: он описывает те же данные.
+    """
+
+    etag_fields = ()
+
+    def get_object_etag(self, obj):
+        """ETag по значениям полей объекта, без рендеринга ответа."""
+        values = "|".join(
+            str(getattr(obj, field)) for field in ("pk",) + self.etag_fields
+        )
+        return quote_etag(hashlib.md5(values.encode()).hexdigest())
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.request.method in SAFE_METHODS or not self.request.META.get(
+            "HTTP_IF_MATCH"
+        ):
+            return obj
+        obj = type(obj)._default_manager.select_for_update().get(pk=obj.pk)
+        if not if_match_passes(
+            self.get_object_etag(obj), self.request.META["HTTP_IF_MATCH"]
+        ):
+            raise PreconditionFailed()
+        return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_object_etag(instance)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        response["ETag"] = etag
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.object_etag = self.get_object_etag(serializer.instance)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            request.method in ("PATCH", "PUT")
+            and response.status_code == status.HTTP_200_OK
+            and getattr(self, "object_etag", None)
+        ):
+            response["ETag"] = self.object_etag
+        return response
@@ -0,0 +1,251 @@
+"""Модуль быстрой выдачи списков.
+
+ModelSerializer на каждое значение каждой строки вызывает get_attribute
+и to_representation своего поля. Для горячих списков сериализатор один
+раз компилируется в функцию, которая собирает словарь прямо из строки
+values(): простые поля приводятся тем же типом, что и в DRF, вложенные
+ForeignKey читаются колонками через __, а many-связи догружаются одним
+запросом на страницу. Сериализатор с полем, которое компилятор не
+знает, остается на обычном пути. Включается настройкой
+API_FAST_SERIALIZERS.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.response import Response
+
+from .pagination import KeysetPagination
+
+PARENT_KEY = "_parent"
+
+# Поля, у которых to_representation - только приведение типа.
+CASTS = {
+    drf_fields.IntegerField: int,
+    drf_fields.FloatField: float,
+    drf_fields.CharField: str,
+    drf_fields.SlugField: str,
+}
+
+_compiled = {}
+
+
+class UnsupportedFieldError(Exception):
+    """Поле нельзя собрать из строки values()."""
+
+
+class RowBuilder:
+    """Компилирует поля сериализатора в функцию build(row, related)."""
+
+    def __init__(self, fields, model, many_allowed=True):
+        self.model = model
+        self.columns = [model._meta.pk.name]
+        self.many = []
+        self.namespace = {}
+        self.many_allowed = many_allowed
+        expression = self.compile_fields(fields, "", model)
+        source = f"def build(row, related):\n    return {expression}\n"
+        exec(source, self.namespace)
+        self.build = self.namespace["build"]
+
+    def column(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return f"row[{name!r}]"
+
+    def constant(self, value):
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def unless_null(self, name, expression):
+        """None для пустой колонки, как у DRF, иначе выражение."""
+        return f"(None if {self.column(name)} is None else {expression})"
+
+    def compile_fields(self, fields, prefix, model):
+        items = ", ".join(
+            f"{name!r}: {self.compile_field(field, prefix, model)}"
+            for name, field in fields.items()
+        )
+        return f"{{{items}}}"
+
+    def compile_field(self, field, prefix, model):
+        source = field.source
+        if "." in source or source == "*":
+            raise UnsupportedFieldError(source)
+        if isinstance(
+            field, (serializers.ListSerializer, relations.ManyRelatedField)
+        ):
+            return self.compile_many(field, prefix, model)
+        if isinstance(field, serializers.ModelSerializer):
+            related_model = model._meta.get_field(source).related_model
+            nested = self.compile_fields(
+                field.fields, f"{prefix}{source}__", related_model
+            )
+            return self.unless_null(prefix + source, nested)
+        if isinstance(field, relations.SlugRelatedField):
+            value = self.column(f"{prefix}{source}__{field.slug_field}")
+            return self.unless_null(prefix + source, value)
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                raise UnsupportedFieldError(source)
+            return self.column(prefix + source)
+        if isinstance(
+            field,
+            (
+                relations.RelatedField,
+                serializers.BaseSerializer,
+                drf_fields.SerializerMethodField,
+            ),
+        ):
+            raise UnsupportedFieldError(source)
+        convert = CASTS.get(type(field), field.to_representation)
+        value = self.column(prefix + source)
+        return self.unless_null(
+            prefix + source, f"{self.constant(convert)}({value})"
+        )
+
+    def compile_many(self, field, prefix, model):
+        """Связь many: дочерние строки догружаются отдельным запросом."""
+        if prefix or not self.many_allowed:
+            raise UnsupportedFieldError(field.source)
+        relation = model._meta.get_field(field.source)
+        if not relation.many_to_many or relation.auto_created:
+            raise UnsupportedFieldError(field.source)
+        child = getattr(field, "child", None) or field.child_relation
+        if isinstance(child, serializers.ModelSerializer):
+            builder = RowBuilder(
+                child.fields, relation.related_model, many_allowed=False
+            )
+        elif isinstance(child, relations.SlugRelatedField):
+            builder = SlugBuilder(child.slug_field)
+        else:
+            raise UnsupportedFieldError(field.source)
+        self.many.append((relation, builder))
+        pk = self.column(self.model._meta.pk.name)
+        return f"related[{len(self.many) - 1}].get({pk}, [])"
+
+
+class SlugBuilder:
+    """Дочерние значения many-связи, отдаваемой слагами."""
+
+    def __init__(self, slug_field):
+        self.columns = [slug_field]
+        self.build = lambda row, related: row[slug_field]
+
+
+class FastSerializer:
+    """Скомпилированный сериализатор списка."""
+
+    def __init__(self, serializer):
+        self.builder = RowBuilder(serializer.fields, serializer.Meta.model)
+        self.columns = self.builder.columns
+
+    def values(self, queryset):
+        """Запрос, отдающий строки для build()."""
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def fetch_related(self, rows):
+        """Дочерние строки many-связей страницы, по запросу на связь.
+
+        Порядок детей - по pk, как в предвыборке DRF-пути.
+        """
+        pks = [row[self.columns[0]] for row in rows]
+        related_rows = []
+        for relation, builder in self.builder.many:
+            query_name = relation.related_query_name()
+            related_rows.append(
+                list(
+                    relation.related_model.objects.filter(
+                        **{f"{query_name}__in": pks}
+                    )
+                    .order_by("pk")
+                    .values(*builder.columns, **{PARENT_KEY: F(query_name)})
+                )
+            )
+        return related_rows
+
+    def build(self, rows, related_rows):
+        related = []
+        for (_, builder), children in zip(self.builder.many, related_rows):
+            grouped = {}
+            for child in children:
+                grouped.setdefault(child[PARENT_KEY], []).append(
+                    builder.build(child, None)
+                )
+            related.append(grouped)
+        build_row = self.builder.build
+        return [build_row(row, related) for row in rows]
+
+    def serialize(self, rows):
+        rows = list(rows)
+        return self.build(rows, self.fetch_related(rows))
+
+    def rows_from_objects(self, objs):
+        """Строки values() по загруженным объектам, для сверки и замеров."""
+        rows = [self.get_row(obj, self.columns) for obj in objs]
+        related_rows = []
+        for relation, builder in self.builder.many:
+            children = []
+            for obj in objs:
+                for child in getattr(obj, relation.name).all():
+                    row = self.get_row(child, builder.columns)
+                    row[PARENT_KEY] = obj.pk
+                    children.append(row)
+            related_rows.append(children)
+        return rows, related_rows
+
+    @staticmethod
+    def get_row(obj, columns):
+        row = {}
+        for column in columns:
+            value = obj
+            *path, name = column.split("__")
+            for part in path:
+                value = getattr(value, part) if value is not None else None
+            if value is not None:
+                try:
+                    name = value._meta.get_field(name).attname
+                except FieldDoesNotExist:
+                    pass
+                value = getattr(value, name)
+            row[column] = value
+        return row
+
+
+def get_fast_serializer(serializer):
+    """Скомпилированный сериализатор или None, если поля не поддержаны."""
+    sparse = serializer.context.get("sparse")
+    key = (type(serializer), sparse and (
+        tuple(sorted(sparse[0])), tuple(sorted(sparse[1]))
+    ))
+    if key not in _compiled:
+        try:
+            _compiled[key] = FastSerializer(serializer)
+        except (UnsupportedFieldError, FieldDoesNotExist):
+            _compiled[key] = None
+    return _compiled[key]
+
+
+class FastListMixin:
+    """Список из values() через скомпилированный сериализатор.
+
+    Курсорная пагинация читает атрибуты объектов, поэтому с параметром
+    cursor используется обычный путь.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fast = None
+        if (
+            settings.API_FAST_SERIALIZERS
+            and KeysetPagination.cursor_query_param not in request.query_params
+        ):
+            fast = get_fast_serializer(self.get_serializer())
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(fast.serialize(queryset))
+        return self.get_paginated_response(fast.serialize(page))
@@ -1,17 +1,84 @@
 """Кастомный фильтр для представления Title.
 """
-from django_filters import CharFilter, FilterSet, NumberFilter
-from reviews.models import Title
+from django.db.models import Count
+from django_filters import (
+    CharFilter,
+    ChoiceFilter,
+    FilterSet,
+    IsoDateTimeFilter,
+    NumberFilter,
+    OrderingFilter,
+)
+from reviews.models import Category, GenreTitle, Title
+
+GENRE_ANY = "any"
+GENRE_ALL = "all"
+
+
+def parse_slugs(value):
+    """Слаги из значения вида a,b без пустых и повторов."""
+    return [
+        slug
+        for slug in dict.fromkeys(part.strip() for part in value.split(","))
+        if slug
+    ]
 
 
 class TitleFilter(FilterSet):
-    """Фильтры по всем полям модели Title."""
+    """Фильтры по всем полям модели Title.
+
+    genre и category принимают несколько слагов через запятую. Жанры
+    проверяются подзапросом IN по GenreTitle, а не JOIN, поэтому
+    произведение с несколькими подходящими жанрами не повторяется в
+    выдаче. genre_mode=all оставляет произведения со всеми жанрами.
+    """
 
     name = CharFilter(field_name="name", lookup_expr="contains")
-    category = CharFilter(field_name="category__slug")
-    genre = CharFilter(field_name="genre__slug", lookup_expr="exact")
+    category = CharFilter(method="filter_category")
+    genre = CharFilter(method="filter_genre")
+    genre_mode = ChoiceFilter(
+        choices=((GENRE_ANY, GENRE_ANY), (GENRE_ALL, GENRE_ALL)),
+        method="filter_genre_mode",
+    )
     year = NumberFilter(field_name="year")
+    rating_min = NumberFilter(field_name="rating", lookup_expr="gte")
+    rating_max = NumberFilter(field_name="rating", lookup_expr="lte")
+    updated_since = IsoDateTimeFilter(field_name="updated", lookup_expr="gte")
+    search = CharFilter(method="filter_search")
+    ordering = OrderingFilter(fields=("rating", "year", "name"))
 
     class Meta:
         model = Title
         fields = ("category", "genre", "name", "year")
+
+    def filter_category(self, queryset, name, value):
+        """Произведения любой из категорий; без слагов фильтра нет."""
+        slugs = parse_slugs(value)
+        if not slugs:
+            return queryset
+        return queryset.filter(
+            category__in=Category.objects.filter(slug__in=slugs)
+        )
+
+    def filter_genre(self, queryset, name, value):
+        """Произведения с любым или, при genre_mode=all, со всеми жанрами."""
+        slugs = parse_slugs(value)
+        if not slugs:
+            return queryset
+        links = GenreTitle.objects.filter(genre__slug__in=slugs)
+        if self.form.cleaned_data.get("genre_mode") == GENRE_ALL:
+            # Связи уникальны, поэтому число связей равно числу жанров.
+            links = (
+                links.values("title_id")
+                .annotate(matched=Count("id"))
+                .filter(matched=len(slugs))
+            )
+        return queryset.filter(id__in=links.values("title_id"))
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Режим учитывается в filter_genre."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Поиск по названию и описанию с ранжированием."""
+        return queryset.search(value)
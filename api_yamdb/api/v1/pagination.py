@@ -0,0 +1,124 @@
+"""Модуль пагинации отзывов и комментариев."""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Верхняя граница id в курсоре: больше не помещается в bigint базы.
+MAX_ID = 2 ** 63
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """Курсорная пагинация по ключу (pub_date, id) без подсчета строк.
+
+    Страница выбирается диапазоном по составному индексу, поэтому
+    N-я страница стоит столько же, сколько первая.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = _("Неверный курсор.")
+
+    def encode_cursor(self, obj, reverse):
+        """Непрозрачный курсор на позицию объекта."""
+        payload = {"d": obj.pub_date.isoformat(), "i": obj.pk}
+        if reverse:
+            payload["r"] = 1
+        return base64.urlsafe_b64encode(
+            json.dumps(payload).encode()
+        ).decode()
+
+    def decode_cursor(self, token):
+        """Разбирает курсор в позицию и направление обхода."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            pub_date = parse_datetime(payload["d"])
+            position = (pub_date, int(payload["i"]))
+            reverse = bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError):
+            pub_date = None
+        if pub_date is None or not 0 < position[1] < MAX_ID:
+            raise ValidationError(
+                {self.cursor_query_param: [self.invalid_cursor_message]}
+            )
+        return position, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        token = request.query_params.get(self.cursor_query_param)
+        position, reverse = None, False
+        if token:
+            position, reverse = self.decode_cursor(token)
+        if reverse:
+            queryset = queryset.order_by("pub_date", "id")
+        else:
+            queryset = queryset.order_by("-pub_date", "-id")
+        if position is not None:
+            pub_date, pk = position
+            lookup = "gt" if reverse else "lt"
+            queryset = queryset.filter(
+                Q(**{f"pub_date__{lookup}e": pub_date}),
+                Q(**{f"pub_date__{lookup}": pub_date})
+                | Q(**{f"id__{lookup}": pk}),
+            )
+        rows = list(queryset[: self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[: self.limit]
+        if reverse:
+            rows.reverse()
+        self.has_next = bool(rows) and (has_more if not reverse else True)
+        self.has_previous = bool(rows) and (
+            has_more if reverse else position is not None
+        )
+        self.page = rows
+        return rows
+
+    def get_cursor_link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(obj, reverse)
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_cursor_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """LimitOffset по умолчанию, курсор по параметру cursor (можно пустым)."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
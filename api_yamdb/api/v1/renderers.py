@@ -0,0 +1,72 @@
+"""
+Модуль рендереров потоковой выгрузки каталога.
+"""
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class StreamingRenderer(BaseRenderer):
+    """Рендерер, отдающий строки по одной для StreamingHttpResponse."""
+
+    charset = "utf-8"
+
+    def stream(self, rows, fields):
+        """Генератор байтов выдачи по последовательности словарей."""
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Неподвижная выдача, например ошибка в виде словаря."""
+        if isinstance(data, dict):
+            data = [data]
+        if not data:
+            return b""
+        return b"".join(self.stream(data, list(data[0])))
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Один JSON-объект на строку."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, rows, fields):
+        for row in rows:
+            line = json.dumps(
+                {field: row[field] for field in fields},
+                cls=JSONEncoder,
+                ensure_ascii=False,
+            )
+            yield (line + "\n").encode(self.charset)
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer, возвращающий записанное."""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    """CSV с заголовком; списки записываются через запятую."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, rows, fields):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields).encode(self.charset)
+        for row in rows:
+            values = []
+            for field in fields:
+                value = row[field]
+                if isinstance(value, (list, tuple)):
+                    value = ",".join(value)
+                elif value is None:
+                    value = ""
+                elif hasattr(value, "isoformat"):
+                    value = value.isoformat()
+                values.append(value)
+            yield writer.writerow(values).encode(self.charset)
@@ -0,0 +1,80 @@
+"""Модуль чтения каталога с реплик базы."""
+from core.routers import choose_replica, eject, read_alias
+from django.conf import settings
+from django.db import InterfaceError, OperationalError
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import get_cache
+
+PRIMARY_PIN_KEY = "api:primary:{}"
+
+
+def pin_primary(user):
+    """После записи пользователь какое-то время читает основную базу."""
+    get_cache().set(
+        PRIMARY_PIN_KEY.format(user.pk),
+        True,
+        settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(
+        get_cache().get(PRIMARY_PIN_KEY.format(user.pk))
+    )
+
+
+class PinPrimaryMixin:
+    """После успешной записи пользователь читает основную базу."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            pin_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaReadMixin(PinPrimaryMixin):
+    """
+    Безопасные запросы представления читают с реплики.
+
+    Пользователь, успешно изменивший данные, следующие
+    REPLICA_STICKY_SECONDS читает основную базу, минуя кеш ответов и 304,
+    и сразу видит свою запись. Закрепление хранится в кеше API, поэтому
+    с репликами он должен быть общим для всех воркеров.
+
+    Если реплика отказала посреди запроса, она исключается, а запрос
+    повторяется на основной базе.
+    """
+
+    replica_failed = False
+
+    def dispatch(self, request, *args, **kwargs):
+        token = read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except (OperationalError, InterfaceError):
+            alias = read_alias.get()
+            if alias is None:
+                raise
+            eject(alias)
+            read_alias.set(None)
+            self.replica_failed = True
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+        ):
+            return
+        self.primary_pinned = is_pinned(request.user)
+        if not self.replica_failed and not self.primary_pinned:
+            read_alias.set(choose_replica())
@@ -2,19 +2,34 @@
 Модуль определения сериализаторов.
 """
 
-from django.db.models import Avg
 from rest_framework.serializers import (
     CharField,
     ChoiceField,
     CurrentUserDefault,
+    FloatField,
+    IntegerField,
     ModelSerializer,
-    SerializerMethodField,
+    PrimaryKeyRelatedField,
     SlugRelatedField,
     ValidationError,
 )
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    Ranking,
+    Review,
+    Title,
+)
 from users.models import User
 
+from .bulk import (
+    PrefetchedSlugRelatedField,
+    ReviewListSerializer,
+    TitleListSerializer,
+)
+from .sparse import SparseFieldsSerializerMixin
+
 
 class UserSerializer(ModelSerializer):
     """Сериализатор пользователя."""
@@ -71,18 +86,27 @@ class UserTokenReceivingSerializer(ModelSerializer):
         fields = ("username", "confirmation_code")
 
 
-class ReviewSerializer(ModelSerializer):
+class AuthorSerializer(ModelSerializer):
+    """Публичные поля автора для ?expand=author."""
+
+    class Meta:
+        """Мета модель определяющая поля выдачи."""
+
+        model = User
+        fields = ("username", "first_name", "last_name", "bio")
+
+
+class ReviewSerializer(SparseFieldsSerializerMixin, ModelSerializer):
     """Сериализатор отзыва"""
 
+    expanded_fields = {"author": AuthorSerializer(read_only=True)}
+
     author = SlugRelatedField(
         default=CurrentUserDefault(),
         read_only=True,
         slug_field="username",
     )
-    title = SlugRelatedField(
-        read_only=True,
-        slug_field="id",
-    )
+    title = PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         """Мета модель определяющая поля выдачи."""
@@ -97,31 +121,43 @@ class ReviewSerializer(ModelSerializer):
         )
         model = Review
 
-    def validate(self, attrs):
-        request = self.context["request"]
-        if request.method == "POST":
-            if Review.objects.filter(
-                author=request.user,
-                title=request.parser_context["kwargs"]["title_id"],
-            ).exists():
-                raise ValidationError(
-                    "Невозможно оставить больше одного отзыва на произведение!"
-                )
-        return attrs
 
+class ReviewImportSerializer(ModelSerializer):
+    """Сериализатор пакетного импорта отзывов"""
+
+    author = PrefetchedSlugRelatedField(
+        queryset=User.objects.all(), slug_field="username"
+    )
+    title = PrefetchedSlugRelatedField(
+        queryset=Title.objects.only("id"), slug_field="id"
+    )
+
+    class Meta:
+        """Мета модель определяющая поля выдачи."""
+
+        fields = (
+            "id",
+            "author",
+            "title",
+            "text",
+            "score",
+            "pub_date",
+        )
+        model = Review
+        list_serializer_class = ReviewListSerializer
 
-class CommentSerializer(ModelSerializer):
+
+class CommentSerializer(SparseFieldsSerializerMixin, ModelSerializer):
     """Сериализатор комментария"""
 
+    expanded_fields = {"author": AuthorSerializer(read_only=True)}
+
     author = SlugRelatedField(
         default=CurrentUserDefault(),
         read_only=True,
         slug_field="username",
     )
-    review = SlugRelatedField(
-        read_only=True,
-        slug_field="id",
-    )
+    review = PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         """Мета модель определяющая поля выдачи."""
@@ -156,12 +192,18 @@ class CategorySerializer(ModelSerializer):
         model = Category
 
 
-class TitleSerializer(ModelSerializer):
+class TitleSerializer(SparseFieldsSerializerMixin, ModelSerializer):
     """Сериализатор для модели Title"""
 
     genre = GenreSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
-    rating = SerializerMethodField(read_only=True)
+    rating = FloatField(read_only=True)
+    collapsed_fields = {
+        "genre": SlugRelatedField(
+            many=True, read_only=True, slug_field="slug"
+        ),
+        "category": SlugRelatedField(read_only=True, slug_field="slug"),
+    }
 
     class Meta:
         """Мета модель определяющая поля выдачи."""
@@ -178,18 +220,14 @@ class TitleSerializer(ModelSerializer):
         model = Title
         ordering = ["-id"]
 
-    def get_rating(self, obj):
-        """Расчет средней оценки для произведения"""
-        return obj.reviews.all().aggregate(Avg("score"))["score__avg"]
-
 
 class TitleSerializerCreate(TitleSerializer):
     """Сериализатор создания  Title"""
 
-    genre = SlugRelatedField(
+    genre = PrefetchedSlugRelatedField(
         queryset=Genre.objects.all(), slug_field="slug", many=True
     )
-    category = SlugRelatedField(
+    category = PrefetchedSlugRelatedField(
         queryset=Category.objects.all(), slug_field="slug"
     )
 
@@ -205,5 +243,20 @@ class TitleSerializerCreate(TitleSerializer):
             "description",
         )
         model = Title
+        list_serializer_class = TitleListSerializer
 
         ordering = ["-id"]
+
+
+class LeaderboardSerializer(ModelSerializer):
+    """Место произведения в рейтинге."""
+
+    id = IntegerField(source="title_id")
+    name = CharField(source="title.name")
+    year = IntegerField(source="title.year")
+
+    class Meta:
+        """Мета модель определяющая поля выдачи."""
+
+        fields = ("id", "name", "year", "score", "votes")
+        model = Ranking
@@ -0,0 +1,37 @@
+"""Модуль инвалидации кеша каталога по сигналам моделей."""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+)
+from users.models import User
+
+from .authentication import user_cache
+from .cache import bump_generation
+
+CACHED_MODELS = (Category, Comment, Genre, GenreTitle, Review, Title, User)
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    """Увеличивает поколение ресурса измененной модели."""
+    if kwargs.get("action", "post_").startswith("post_"):
+        bump_generation(sender._meta.model_name)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_catalog_cache, sender=model)
+    post_delete.connect(invalidate_catalog_cache, sender=model)
+m2m_changed.connect(invalidate_catalog_cache, sender=Title.genre.through)
+
+
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Сбрасывает закешированный снимок измененного пользователя."""
+    user_cache.invalidate_user(instance.pk)
+
+
+post_save.connect(invalidate_user_snapshot, sender=User)
+post_delete.connect(invalidate_user_snapshot, sender=User)
@@ -0,0 +1,142 @@
+"""Модуль выборочных полей ответа: ?fields=id,name и ?expand=genre.
+
+Без этих параметров ответ не меняется. С ними сериализатор оставляет
+только перечисленные поля, а связи отдает слагами, если их нет в
+expand. Представление по тем же параметрам загружает только нужные
+колонки (only()) и не присоединяет связи, которых не будет в ответе.
+"""
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsSerializerMixin:
+    """Оставляет поля из контекста sparse, сворачивая связи в слаги.
+
+    Связь, объявленная вложенным сериализатором, сворачивается полем из
+    collapsed_fields; связь, объявленная слагом, разворачивается полем
+    из expanded_fields.
+    """
+
+    collapsed_fields = {}
+    expanded_fields = {}
+
+    @classmethod
+    def get_relation_field(cls, name, expanded):
+        """Поле связи в свернутом или развернутом виде."""
+        if expanded:
+            return cls.expanded_fields.get(name, cls._declared_fields[name])
+        return cls.collapsed_fields.get(name, cls._declared_fields[name])
+
+    @classmethod
+    def get_expandable(cls):
+        return set(cls.collapsed_fields) | set(cls.expanded_fields)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = self.context.get("sparse")
+        if sparse is None:
+            return fields
+        requested, expand = sparse
+        expandable = self.get_expandable()
+        for name in list(fields):
+            if name not in requested:
+                del fields[name]
+            elif name in expandable:
+                fields[name] = copy.deepcopy(
+                    self.get_relation_field(name, name in expand)
+                )
+        return fields
+
+
+class SparseFieldsMixin:
+    """Разбирает ?fields=/?expand= и строит по ним запрос к базе."""
+
+    sparse_actions = ("list", "retrieve")
+    # Колонки, которые читает сама выдача (курсор, ETag), а не сериализатор.
+    sparse_required = ()
+
+    def get_sparse_fields(self):
+        """(поля, развернутые связи) или None без параметров."""
+        if hasattr(self, "sparse_fields"):
+            return self.sparse_fields
+        self.sparse_fields = None
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not (
+            FIELDS_PARAM in params or EXPAND_PARAM in params
+        ):
+            return None
+        serializer_class = self.get_serializer_class()
+        available = set(serializer_class.Meta.fields)
+        requested = parse_names(params.get(FIELDS_PARAM, "")) or available
+        expand = parse_names(params.get(EXPAND_PARAM, ""))
+        errors = {}
+        if requested - available:
+            errors[FIELDS_PARAM] = sorted(requested - available)
+        if expand - serializer_class.get_expandable():
+            errors[EXPAND_PARAM] = sorted(
+                expand - serializer_class.get_expandable()
+            )
+        if errors:
+            raise ValidationError(
+                {
+                    param: [f"Неизвестные поля: {', '.join(names)}."]
+                    for param, names in errors.items()
+                }
+            )
+        self.sparse_fields = (requested | expand, expand)
+        return self.sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["sparse"] = self.get_sparse_fields()
+        return context
+
+    def get_related_columns(self, name, expanded):
+        """Колонки связанной модели для свернутой или полной связи."""
+        field = self.get_serializer_class().get_relation_field(name, expanded)
+        field = getattr(field, "child", field)
+        if expanded:
+            return field.Meta.fields
+        return (getattr(field, "child_relation", field).slug_field,)
+
+    def apply_sparse_fields(self, queryset, fields, expand):
+        """only() по запрошенным полям, связи - только запрошенные."""
+        model = queryset.model
+        columns = {model._meta.pk.name, *self.sparse_required}
+        if self.action == "retrieve":
+            columns.update(getattr(self, "etag_fields", ()))
+        serializer_class = self.get_serializer_class()
+        for name in fields:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Аннотация запроса, например rating.
+                continue
+            if name not in serializer_class.get_expandable():
+                columns.add(name)
+                continue
+            related = self.get_related_columns(name, name in expand)
+            if field.many_to_many:
+                queryset = queryset.prefetch_related(
+                    Prefetch(
+                        name,
+                        queryset=field.related_model.objects.only(
+                            "pk", *related
+                        ).order_by("pk"),
+                    )
+                )
+            else:
+                queryset = queryset.select_related(name)
+                columns.add(name)
+                columns.update(f"{name}__{column}" for column in related)
+        return queryset.only(*columns)
@@ -0,0 +1,132 @@
+"""Модуль ограничения частоты запросов скользящим окном.
+
+rate ("10/min") задает число запросов за период. Запросы считаются в
+окнах длиной в период: к счетчику текущего окна добавляется счетчик
+предыдущего с весом оставшейся доли его перекрытия, поэтому лимит
+освобождается плавно, а не целиком на границе окна. Это приближение:
+запросы внутри прошлого окна считаются равномерно распределенными.
+
+Счетчики меняются только атомарными add/incr/decr общего кеша API, так
+что параллельные воркеры не затирают чужие запросы. Представление
+задает группу через throttle_scope; без нее ограничиваются только
+изменяющие запросы группы write.
+"""
+import time
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .cache import get_cache
+
+THROTTLE_KEY = "api:throttle:{}:{}:{}"
+DEFAULT_WRITE_SCOPE = "write"
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Лимит запросов по ключу, который определяет подкласс."""
+
+    THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+    rate_suffix = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        """Группа запросов: throttle_scope или write для изменений."""
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None and request.method not in SAFE_METHODS:
+            return DEFAULT_WRITE_SCOPE
+        return scope
+
+    def get_rate_name(self, scope):
+        if self.rate_suffix is None:
+            return scope
+        return f"{scope}_{self.rate_suffix}"
+
+    def get_ident_key(self, request, view):
+        """Ключ счетчика внутри группы; None отключает проверку."""
+        raise NotImplementedError
+
+    @staticmethod
+    def parse_rate(rate):
+        """'10/min' -> (емкость, период в секундах)."""
+        num, period = rate.split("/")
+        return int(num), PERIODS[period[0]]
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+        rate = self.THROTTLE_RATES.get(self.get_rate_name(scope))
+        ident = self.get_ident_key(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, period = self.parse_rate(rate)
+        cache = get_cache()
+        now = time.time()
+        window = int(now // period)
+        name = self.get_rate_name(scope)
+        key = THROTTLE_KEY.format(name, ident, window)
+        count = self.increment(cache, key, period * 2)
+        previous = cache.get(THROTTLE_KEY.format(name, ident, window - 1), 0)
+        elapsed = now - window * period
+        used = count + previous * (1 - elapsed / period)
+        if used <= capacity:
+            return True
+        # Отклоненный запрос не расходует лимит.
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+        if count > capacity:
+            self.wait_seconds = period - elapsed
+        else:
+            self.wait_seconds = (used - capacity) * period / previous
+        return False
+
+    @staticmethod
+    def increment(cache, key, timeout):
+        """Атомарно увеличивает счетчик окна, создавая его при нужде."""
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Счетчик истек между add и incr.
+            cache.add(key, 1, timeout)
+            return 1
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPWindowThrottle(SlidingWindowThrottle):
+    """Лимит на IP-адрес клиента (с учетом NUM_PROXIES)."""
+
+    rate_suffix = "ip"
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserWindowThrottle(SlidingWindowThrottle):
+    """Лимит на пользователя или на username из тела запроса."""
+
+    rate_suffix = "user"
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"id:{request.user.pk}"
+        data = request.data if isinstance(request.data, dict) else {}
+        username = data.get("username")
+        if isinstance(username, str) and username:
+            return f"name:{username.lower()}"
+        return None
+
+
+class ScopeWindowThrottle(SlidingWindowThrottle):
+    """Один лимит на всю группу: потолок нагрузки на эндпоинты."""
+
+    def get_ident_key(self, request, view):
+        return "all"
@@ -1,25 +1,25 @@
-"""Модуль генерации и отправки кода подтверждения."""
+"""Модуль генерации кода подтверждения и постановки письма в очередь."""
+from core.models import OutgoingEmail
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.shortcuts import get_object_or_404
-from users.models import User
 
 
-def confirmation_code(self):
-    """Формирует код подтвержденияe-mail."""
-    user = get_object_or_404(User, username=self)
+def confirmation_code(user):
+    """Формирует код подтверждения e-mail."""
     return default_token_generator.make_token(user)
 
 
-def sending_registration_code(self):
-    """Формирует и отправляет письмо с кодом подтверждения."""
-    send_mail(
-        "Подтверждение почты",
-        (
+def sending_registration_code(user):
+    """Ставит письмо с кодом подтверждения в очередь на отправку.
+
+    Письмо отправит команда process_outbox; повторная регистрация
+    заменяет еще не отправленное письмо на тот же адрес.
+    """
+    OutgoingEmail.objects.enqueue(
+        recipient=user.email,
+        subject="Подтверждение почты",
+        body=(
             f"Ваш код подтверждения для авторизации:"
-            f"{confirmation_code(self.validated_data.get('username'))}"
+            f"{confirmation_code(user)}"
         ),
-        "from@example.com",
-        [self.validated_data.get("email")],
-        fail_silently=False,
+        dedupe_key=f"signup:{user.email.lower()}",
     )
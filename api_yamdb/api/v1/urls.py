@@ -2,6 +2,7 @@
 Модуль определения публикуемых страниц.
 """
 
+from core.views import metrics
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -11,6 +12,8 @@ from .views import (
     CreateUserAPIView,
     GenreViewSet,
     GetTokenAPIView,
+    LeaderboardViewSet,
+    ReviewImportAPIView,
     ReviewViewSet,
     TitleViewSet,
     UserViewSet,
@@ -40,7 +43,19 @@ token = [
 ]
 
 
+leaderboard = LeaderboardViewSet.as_view({"get": "list"})
+
 urlpatterns = [
+    path("metrics", metrics, name="metrics"),
+    path(
+        "reviews/import/", ReviewImportAPIView.as_view(), name="reviews-import"
+    ),
+    path("leaderboards/<str:board>/", leaderboard, name="leaderboards"),
+    path(
+        "leaderboards/<str:board>/<slug:slug>/",
+        leaderboard,
+        name="leaderboards-group",
+    ),
     path("", include(router.urls)),
     path("auth/", include(token)),
 ]
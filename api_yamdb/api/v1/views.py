@@ -1,12 +1,21 @@
 """
 Модуль определения представлений.
 """
+from collections import defaultdict
+from itertools import islice
+
+from core.routers import read_alias
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import (
@@ -15,22 +24,39 @@ from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Ranking,
+    Review,
+    Title,
+)
 from users.models import User
 
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin, ConditionalObjectMixin
+from .fastpath import FastListMixin
 from .filters import TitleFilter
+from .pagination import LimitOffsetOrCursorPagination
 from .permission import (
     IsAdministrator,
     IsAdminOnly,
     IsAuthorOrIsStaffPermission,
 )
+from .renderers import CSVRenderer, NDJSONRenderer
+from .replicas import PinPrimaryMixin, ReplicaReadMixin
 from .serializers import (
     CategorySerializer,
     CommentSerializer,
     GenreSerializer,
+    LeaderboardSerializer,
+    ReviewImportSerializer,
     ReviewSerializer,
     TitleSerializer,
     TitleSerializerCreate,
@@ -38,8 +64,27 @@ from .serializers import (
     UserSignupSerializer,
     UserTokenReceivingSerializer,
 )
+from .sparse import SparseFieldsMixin
 from .token import sending_registration_code
-from .viewsets import ListCreateDeleteViewSet
+from .viewsets import ListCreateDeleteViewSet, ListViewSet
+
+
+class ReviewImportAPIView(PinPrimaryMixin, APIView):
+    """Пакетный импорт отзывов администратором."""
+
+    permission_classes = (
+        IsAuthenticated,
+        IsAdministrator,
+    )
+
+    def post(self, request):
+        """Проверяет и сохраняет JSON-массив отзывов одним пакетом."""
+        serializer = ReviewImportSerializer(
+            data=request.data, many=True, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class UserViewSet(ModelViewSet):
@@ -91,14 +136,16 @@ class CreateUserAPIView(APIView):
     """Класс представления регистрации пользователя."""
 
     permission_classes = (AllowAny,)
+    throttle_scope = "signup"
     queryset = User.objects.all()
 
     def post(self, request):
         """Метод проверки данных и генерации писем для активации."""
         serializer = UserSignupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        sending_registration_code(serializer)
+        with transaction.atomic():
+            user = serializer.save()
+            sending_registration_code(user)
         return Response(
             serializer.validated_data,
             status=status.HTTP_200_OK,
@@ -109,6 +156,7 @@ class GetTokenAPIView(APIView):
     """Класс представления для выдачи токена."""
 
     permission_classes = (AllowAny,)
+    throttle_scope = "token"
 
     def post(self, request):
         """Метод проверки confirmation_code и выдачи токена API."""
@@ -128,55 +176,122 @@ class GetTokenAPIView(APIView):
         )
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    ConditionalObjectMixin,
+    FastListMixin,
+    ModelViewSet,
+):
     """Класс представления ревью."""
 
+    cache_dependencies = ("review", "user")
+    conditional_actions = ("list",)
+    sparse_required = ("pub_date",)
+    etag_fields = ("text", "score", "pub_date", "author_id")
     serializer_class = ReviewSerializer
+    pagination_class = LimitOffsetOrCursorPagination
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorOrIsStaffPermission,
     )
 
+    def get_title(self):
+        """Произведение из адреса; запрашивается один раз за запрос."""
+        if getattr(self, "title", None) is None:
+            self.title = get_object_or_404(
+                Title.objects.only("id"), id=self.kwargs.get("title_id")
+            )
+        return self.title
+
     def get_queryset(self):
         """Метод обработки запроса."""
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        queryset = Review.objects.filter(title=self.get_title())
+        sparse = self.get_sparse_fields()
+        if sparse is None:
+            return queryset.select_related("author")
+        return self.apply_sparse_fields(queryset, *sparse)
 
     def perform_create(self, serializer):
-        """Метод предопределения автора."""
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
-
-
-class CommentViewSet(ModelViewSet):
+        """Метод предопределения автора.
+
+        Повторный отзыв отсекает ограничение unique_review_title, что
+        исключает гонку между проверкой и вставкой.
+        """
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=self.request.user, title=self.get_title()
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "Невозможно оставить больше одного отзыва "
+                        "на произведение!"
+                    ]
+                }
+            )
+
+
+class CommentViewSet(
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    ConditionalObjectMixin,
+    FastListMixin,
+    ModelViewSet,
+):
     """Класс представления комментария."""
 
+    cache_dependencies = ("comment", "user")
+    conditional_actions = ("list",)
+    sparse_required = ("pub_date",)
+    etag_fields = ("text", "pub_date", "author_id")
     serializer_class = CommentSerializer
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorOrIsStaffPermission,
     )
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
+
+    def get_review(self):
+        """Отзыв из адреса, принадлежащий произведению из адреса.
+
+        Вся цепочка title_id/review_id проверяется одним запросом.
+        """
+        if getattr(self, "review", None) is None:
+            self.review = get_object_or_404(
+                Review.objects.only("id", "title_id"),
+                id=self.kwargs.get("review_id"),
+                title_id=self.kwargs.get("title_id"),
+            )
+        return self.review
 
     def get_queryset(self):
         """Метод обработки запроса."""
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        queryset = Comment.objects.filter(review=self.get_review())
+        sparse = self.get_sparse_fields()
+        if sparse is None:
+            return queryset.select_related("author")
+        return self.apply_sparse_fields(queryset, *sparse)
 
     def perform_create(self, serializer):
         """Метод предопределения автора."""
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
 
 
-class GenreViewSet(ListCreateDeleteViewSet):
+class GenreViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    ListCreateDeleteViewSet,
+):
     """ViewSet для эндпойнта /genre/
     c пагинацией и поиском по полю name"""
 
+    cache_dependencies = ("genre",)
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     lookup_field = "slug"
@@ -189,10 +304,16 @@ class GenreViewSet(ListCreateDeleteViewSet):
     search_fields = ("name",)
 
 
-class CategoryViewSet(ListCreateDeleteViewSet):
+class CategoryViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    ListCreateDeleteViewSet,
+):
     """ViewSet для эндпойнта /Category/
     c пагинацией и поиском по полю name"""
 
+    cache_dependencies = ("category",)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = "slug"
@@ -205,20 +326,187 @@ class CategoryViewSet(ListCreateDeleteViewSet):
     )
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    FastListMixin,
+    ModelViewSet,
+):
     """Отображение действий с произведениями"""
 
+    cache_dependencies = ("title", "genretitle", "genre", "category", "review")
     http_method_names = ["get", "post", "delete", "patch"]
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAdminOnly,
     )
+    cache_actions = ("list", "retrieve", "facets")
+    conditional_actions = ("list", "retrieve", "export", "facets")
+    export_fields = (
+        "id",
+        "name",
+        "year",
+        "description",
+        "category",
+        "genre",
+        "rating",
+        "updated",
+    )
     queryset = Title.objects.all()
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
 
+    def get_queryset(self):
+        """Для чтения отдает произведения одним аннотированным запросом.
+
+        Рейтинг аннотируется и для изменения: get_object() применяет те же
+        фильтры, а rating_min, rating_max и ordering=rating без него падают.
+        """
+        if self.action not in ("list", "retrieve"):
+            return super().get_queryset().with_rating()
+        sparse = self.get_sparse_fields()
+        if sparse is None:
+            return Title.objects.for_catalog()
+        # Рейтинг нужен фильтрам и сортировке, даже если его нет в ответе.
+        return self.apply_sparse_fields(Title.objects.with_rating(), *sparse)
+
     def get_serializer_class(self):
         """Метод предопределения сериализатора в зависимости от запроса."""
         if self.action in ("list", "retrieve"):
             return TitleSerializer
         return TitleSerializerCreate
+
+    def create(self, request, *args, **kwargs):
+        """Создает одно произведение или пакет из JSON-массива."""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        prefetch_related_objects(
+            serializer.instance,
+            Prefetch("genre", queryset=Genre.objects.order_by("pk")),
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=("GET",))
+    def facets(self, request):
+        """Счетчики для боковой панели фильтров.
+
+        Принимает те же фильтры, что и список, и отдает число
+        произведений по жанрам, категориям и десятилетиям.
+        """
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        queryset = self.filter_queryset(Title.objects.with_rating())
+        return Response(queryset.facets())
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        renderer_classes=(NDJSONRenderer, CSVRenderer),
+    )
+    def export(self, request):
+        """Потоковая выгрузка каталога (?format=ndjson|csv).
+
+        Принимает те же фильтры, что и список, включая updated_since.
+        """
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        # Тело читается уже после dispatch, когда реплика запроса
+        # сброшена, поэтому база привязывается к запросам явно.
+        queryset = self.filter_queryset(
+            Title.objects.using(read_alias.get()).with_rating()
+        )
+        if not queryset.query.order_by:
+            queryset = queryset.order_by("id")
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                self.iter_export_rows(queryset), self.export_fields
+            ),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="titles.{renderer.format}"'
+        )
+        return response
+
+    def iter_export_rows(self, queryset):
+        """Строки выгрузки; жанры догружаются одним запросом на пачку."""
+        chunk_size = settings.API_EXPORT_CHUNK_SIZE
+        rows = queryset.values(
+            "id",
+            "name",
+            "year",
+            "description",
+            "category__slug",
+            "rating",
+            "updated",
+        ).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            genres = defaultdict(list)
+            for title_id, slug in (
+                GenreTitle.objects.using(queryset.db)
+                .filter(
+                    title_id__in=[row["id"] for row in chunk],
+                    genre__isnull=False,
+                )
+                .order_by("id")
+                .values_list("title_id", "genre__slug")
+            ):
+                genres[title_id].append(slug)
+            for row in chunk:
+                row["category"] = row.pop("category__slug")
+                row["genre"] = genres[row["id"]]
+                yield row
+
+
+class LeaderboardViewSet(
+    ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, ListViewSet
+):
+    """Предрасчитанные рейтинги произведений.
+
+    /leaderboards/overall/ и /leaderboards/trending/ - общие рейтинги,
+    /leaderboards/genre/<slug>/ и /leaderboards/category/<slug>/ -
+    рейтинги внутри жанра и категории.
+    """
+
+    cache_dependencies = ("ranking", "review", "title", "genretitle")
+    conditional_actions = ("list",)
+    serializer_class = LeaderboardSerializer
+    pagination_class = LimitOffsetPagination
+    group_models = {Ranking.CATEGORY: Category, Ranking.GENRE: Genre}
+
+    def get_board_key(self):
+        """Рейтинг и id категории или жанра из адреса."""
+        board = self.kwargs["board"]
+        slug = self.kwargs.get("slug")
+        if board not in dict(Ranking.BOARDS):
+            raise Http404
+        model = self.group_models.get(board)
+        if (model is None) != (slug is None):
+            raise Http404
+        if model is None:
+            return board, 0
+        return board, get_object_or_404(model.objects.only("id"), slug=slug).id
+
+    def get_queryset(self):
+        """Чтение идет по индексу (board, key, -score)."""
+        board, key = self.get_board_key()
+        return (
+            Ranking.objects.filter(board=board, key=key)
+            .select_related("title")
+            .only("score", "votes", "title__name", "title__year")
+            .order_by("-score", "title_id")
+        )
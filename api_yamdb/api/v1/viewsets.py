@@ -13,3 +13,9 @@ class ListCreateDeleteViewSet(
     """Представитель для предоставления прав на List, Create, Delete."""
 
     ...
+
+
+class ListViewSet(mixins.ListModelMixin, GenericViewSet):
+    """Представитель только для списка."""
+
+    ...
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "rest_framework_simplejwt",
@@ -34,6 +35,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.LoadSheddingMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -77,7 +81,70 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения каталога: DB_REPLICAS="адрес=вес,адрес=вес", где
+# адрес - HOST[:PORT] для PostgreSQL или путь к файлу для SQLite.
+DATABASE_REPLICAS = {}
+for number, entry in enumerate(
+    filter(None, os.getenv("DB_REPLICAS", default="").split(",")), 1
+):
+    address, _, weight = entry.strip().partition("=")
+    replica = dict(DATABASES["default"], TEST={"MIRROR": "default"})
+    if replica["ENGINE"].endswith("sqlite3"):
+        replica["NAME"] = address
+    else:
+        replica["HOST"], _, port = address.partition(":")
+        replica["PORT"] = port or replica["PORT"]
+    DATABASES[f"replica{number}"] = replica
+    DATABASE_REPLICAS[f"replica{number}"] = int(weight or 1)
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", default=10))
+REPLICA_EJECT_SECONDS = int(os.getenv("REPLICA_EJECT_SECONDS", default=30))
+
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+
+# Cache
+#
+# Поколения ответов каталога, закрепление за основной базой, лимиты
+# запросов и счетчик сброса нагрузки живут в кеше API_CACHE_ALIAS. Под
+# gunicorn с несколькими воркерами это должен быть общий кеш с атомарными
+# add/incr (Memcached, как в infra/example.env): LocMemCache у каждого
+# процесса свой, и инвалидация в одном воркере не видна остальным.
+# LocMemCache по умолчанию годится только для разработки в одном процессе.
+# FileBasedCache и DummyCache не дают атомарных счетчиков: лимиты и сброс
+# нагрузки с ними работают приблизительно (предупреждение core.W001), а с
+# репликами DB_REPLICAS нельзя использовать и LocMemCache (core.E002).
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="yamdb"),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", default=300)),
+    }
+}
+
+API_CACHE_ALIAS = os.getenv("API_CACHE_ALIAS", default="default")
+
+API_BULK_MAX_ITEMS = int(os.getenv("API_BULK_MAX_ITEMS", default=10000))
+API_BULK_BATCH_SIZE = int(os.getenv("API_BULK_BATCH_SIZE", default=1000))
+API_EXPORT_CHUNK_SIZE = int(os.getenv("API_EXPORT_CHUNK_SIZE", default=2000))
+# Списки произведений, отзывов и комментариев из values() (api.v1.fastpath).
+API_FAST_SERIALIZERS = (
+    os.getenv("API_FAST_SERIALIZERS", default="false").lower() == "true"
+)
+
+LEADERBOARD_PRIOR_MEAN = float(
+    os.getenv("LEADERBOARD_PRIOR_MEAN", default=5.5)
+)
+LEADERBOARD_PRIOR_VOTES = int(os.getenv("LEADERBOARD_PRIOR_VOTES", default=10))
+LEADERBOARD_MIN_VOTES = int(os.getenv("LEADERBOARD_MIN_VOTES", default=1))
+LEADERBOARD_TRENDING_DAYS = int(
+    os.getenv("LEADERBOARD_TRENDING_DAYS", default=7)
+)
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -127,15 +194,48 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=10),
 }
 
+JWT_USER_CACHE_SIZE = int(os.getenv("JWT_USER_CACHE_SIZE", default=10000))
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", default=60))
+
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+DEFAULT_FROM_EMAIL = "from@example.com"
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.v1.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 5,
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.v1.throttling.IPWindowThrottle",
+        "api.v1.throttling.UserWindowThrottle",
+        "api.v1.throttling.ScopeWindowThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "signup_ip": "10/hour",
+        "signup_user": "3/hour",
+        "signup": "300/min",
+        "token_ip": "30/min",
+        "token_user": "10/min",
+        "token": "600/min",
+        "write_ip": "300/min",
+        "write_user": "120/min",
+        "write": "6000/min",
+    },
 }
+
+LOAD_SHED_MAX_INFLIGHT = int(os.getenv("LOAD_SHED_MAX_INFLIGHT", default=256))
+LOAD_SHED_MAX_WRITES = int(os.getenv("LOAD_SHED_MAX_WRITES", default=128))
+LOAD_SHED_WINDOW = int(os.getenv("LOAD_SHED_WINDOW", default=30))
+LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", default=5))
+
+# Сжатие ответов (core.middleware.CompressionMiddleware); brotli - если
+# установлен пакет brotli.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", default=1024))
+COMPRESSION_BROTLI_LEVEL = int(
+    os.getenv("COMPRESSION_BROTLI_LEVEL", default=5)
+)
@@ -0,0 +1,14 @@
+"""Настройки для pytest: тесты с базой идут на SQLite в памяти.
+
+Сам settings.py по-прежнему настроен на PostgreSQL (это проверяет
+tests/test_settings.py), а CI запускает тесты без сервера базы.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+DATABASE_REPLICAS = {}
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.models import OutgoingEmail
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
 
@@ -39,9 +40,24 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
 
 
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "recipient",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("recipient",)
+
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(User)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
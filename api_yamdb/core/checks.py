@@ -0,0 +1,66 @@
+"""Системные проверки настроек проекта."""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+# Бэкенды без атомарных add/incr/decr, общих для всех процессов.
+NON_ATOMIC_CACHES = (
+    "django.core.cache.backends.filebased.FileBasedCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+# Бэкенды, которые не видны всем воркерам сразу.
+NON_SHARED_CACHES = NON_ATOMIC_CACHES + (
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+
+def get_api_cache_backend():
+    return settings.CACHES.get(settings.API_CACHE_ALIAS, {}).get("BACKEND")
+
+
+def uses_cache_counters():
+    """Включены ли лимиты запросов или сброс нагрузки."""
+    rest_framework = getattr(settings, "REST_FRAMEWORK", {})
+    return bool(
+        rest_framework.get("DEFAULT_THROTTLE_CLASSES")
+        or settings.LOAD_SHED_MAX_INFLIGHT
+        or settings.LOAD_SHED_MAX_WRITES
+    )
+
+
+@register()
+def check_api_cache(app_configs, **kwargs):
+    """Лимиты запросов и сброс нагрузки неточны без атомарных счетчиков.
+
+    Запуск это не блокирует: счетчики на таком кеше лишь теряют часть
+    запросов при гонках, а на DummyCache ограничения не срабатывают.
+    """
+    backend = get_api_cache_backend()
+    if backend not in NON_ATOMIC_CACHES or not uses_cache_counters():
+        return []
+    return [
+        Warning(
+            f"API_CACHE_ALIAS {settings.API_CACHE_ALIAS!r} uses {backend}, "
+            "which has no atomic counters; throttling and load shedding "
+            "will be approximate.",
+            hint="Use a shared cache with atomic add/incr, e.g. "
+            "MemcachedCache.",
+            id="core.W001",
+        )
+    ]
+
+
+@register()
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Закрепление за основной базой должно быть видно всем воркерам."""
+    backend = get_api_cache_backend()
+    if not settings.DATABASE_REPLICAS or backend not in NON_SHARED_CACHES:
+        return []
+    return [
+        Error(
+            f"DATABASE_REPLICAS requires a shared API cache, but "
+            f"API_CACHE_ALIAS {settings.API_CACHE_ALIAS!r} uses {backend}.",
+            hint="A worker that did not see the write would read a stale "
+            "replica; use a shared cache such as MemcachedCache.",
+            id="core.E002",
+        )
+    ]
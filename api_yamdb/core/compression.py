@@ -0,0 +1,96 @@
+"""Модуль сжатия ответов по Accept-Encoding.
+
+gzip доступен всегда, brotli - если установлен пакет brotli. Из
+кодировок, которые принимает клиент, выбирается с наибольшим q, при
+равных - первая в ENCODINGS.
+"""
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_LEVEL)
+
+
+def brotli_compress_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_LEVEL)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Кодировка -> (сжатие байтов, сжатие потока), в порядке предпочтения.
+ENCODINGS = {"gzip": (compress_string, compress_sequence)}
+if brotli is not None:
+    ENCODINGS = {
+        "br": (brotli_compress, brotli_compress_sequence),
+        **ENCODINGS,
+    }
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding с их q."""
+    weights = {}
+    for item in header.split(","):
+        coding, *params = item.strip().split(";")
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.strip().lower()] = weight
+    return weights
+
+
+def choose_encoding(header):
+    """Лучшая поддерживаемая кодировка для клиента или None."""
+    weights = parse_accept_encoding(header)
+    default = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def has_compressible_type(response):
+    """Ответ без кодировки и текстового типа."""
+    return not response.has_header("Content-Encoding") and response.get(
+        "Content-Type", ""
+    ).startswith(COMPRESSIBLE_TYPES)
+
+
+def is_compressible(response):
+    """Ответ без кодировки, текстового типа и не меньше порога."""
+    return has_compressible_type(response) and (
+        response.streaming
+        or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+    )
+
+
+def compress_variants(content):
+    """Сжатое содержимое во всех кодировках, если оно стало короче."""
+    variants = {}
+    for encoding, (compress, _) in ENCODINGS.items():
+        compressed = compress(content)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
@@ -0,0 +1,261 @@
+"""Команда разбора планов запросов эндпоинтов API."""
+import json
+import re
+from collections import Counter
+
+from api.v1.urls import router
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User, UserRoles
+
+SCAN = "seq_scan"
+SORT = "sort"
+NOT_COVERING = "not_covering"
+
+SQLITE_DETAIL = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)")
+
+# Параметры списков, которыми клиенты обращаются к каталогу.
+VARIANTS = {
+    "titles-list": (
+        "",
+        "genre={genre}",
+        "category={category}",
+        "year={year}",
+        "ordering=-rating",
+        "search={word}",
+        "fields=id,name,genre",
+        "offset={offset}",
+    ),
+    "titles-facets": ("", "genre={genre}"),
+    "reviews-list": ("", "cursor=", "offset={offset}"),
+    "comments-list": ("", "cursor="),
+}
+LEADERBOARDS = ("overall", "trending", "genre/{genre}", "category/{category}")
+ISOLATED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "analyze-queries",
+    }
+}
+
+
+def get_samples():
+    """Значения параметров адресов: самые нагруженные объекты базы."""
+    review = (
+        Review.objects.annotate(comment_count=Count("comments"))
+        .order_by("-comment_count")
+        .values("id", "title_id", "text")
+        .first()
+    )
+    if review is None:
+        raise CommandError("database has no reviews, run generate_data")
+    title = Title.objects.values("year").get(id=review["title_id"])
+    words = re.findall(r"\w{4,}", review["text"])
+    return {
+        "title_id": review["title_id"],
+        "review_id": review["id"],
+        "comment_id": Comment.objects.filter(review_id=review["id"])
+        .values_list("id", flat=True)
+        .first(),
+        "genre": Genre.objects.values_list("slug", flat=True).first(),
+        "category": Category.objects.values_list("slug", flat=True).first(),
+        "year": title["year"],
+        "word": words[0] if words else "a",
+        "offset": Review.objects.filter(title_id=review["title_id"]).count()
+        // 2,
+    }
+
+
+def get_endpoints(samples, admin):
+    """(маршрут, адрес) для каждого GET-действия вьюсетов api/v1."""
+    lookups = {
+        "users": admin.username,
+        "titles": samples["title_id"],
+        "reviews": samples["review_id"],
+        "comments": samples["comment_id"],
+    }
+    nested = {
+        "title_id": samples["title_id"],
+        "review_id": samples["review_id"],
+    }
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            # У действий mapping - MethodMapper, где get() - декоратор.
+            action = dict(route.mapping).get("get")
+            if action is None or not hasattr(viewset, action):
+                continue
+            name = route.name.format(basename=basename)
+            kwargs = {
+                key: value
+                for key, value in nested.items()
+                if f"<{key}>" in prefix
+            }
+            if route.detail:
+                if lookups.get(basename) is None:
+                    continue
+                kwargs[viewset.lookup_field] = lookups[basename]
+            url = reverse(f"api:{name}", kwargs=kwargs)
+            for query in VARIANTS.get(name, ("",)):
+                query = query.format(**samples)
+                yield name, f"{url}?{query}" if query else url
+    for board in LEADERBOARDS:
+        board = board.format(**samples)
+        yield "leaderboards", f"/api/v1/leaderboards/{board}/"
+
+
+def explain_sqlite(cursor, sql):
+    """Замечания по EXPLAIN QUERY PLAN SQLite."""
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+    plan = [row[-1] for row in cursor.fetchall()]
+    flags = []
+    for detail in plan:
+        match = SQLITE_DETAIL.match(detail)
+        if detail.startswith("USE TEMP B-TREE"):
+            flags.append((SORT, detail[len("USE TEMP B-TREE FOR "):]))
+        elif match and match.group(1) == "SCAN" and "USING" not in detail:
+            flags.append((SCAN, match.group(2)))
+        elif (
+            match
+            and "USING INDEX" in detail
+            and "COVERING" not in detail
+        ):
+            flags.append((NOT_COVERING, match.group(2)))
+    return flags, plan
+
+
+def walk_postgresql(node, flags):
+    node_type = node["Node Type"]
+    if node_type == "Seq Scan":
+        flags.append((SCAN, node["Relation Name"]))
+    elif node_type in ("Sort", "Incremental Sort"):
+        flags.append((SORT, ", ".join(node.get("Sort Key", ()))))
+    elif node_type in ("Index Scan", "Bitmap Heap Scan") and "Filter" in node:
+        flags.append((NOT_COVERING, node["Relation Name"]))
+    for child in node.get("Plans", ()):
+        walk_postgresql(child, flags)
+
+
+def explain_postgresql(cursor, sql):
+    """Замечания по EXPLAIN (FORMAT JSON) PostgreSQL."""
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    flags = []
+    walk_postgresql(plan[0]["Plan"], flags)
+    return flags, [json.dumps(plan[0]["Plan"], indent=2)]
+
+
+EXPLAINERS = {"sqlite": explain_sqlite, "postgresql": explain_postgresql}
+
+
+class Command(BaseCommand):
+    """Команда проигрывает GET-запросы всех действий api/v1 на текущей
+    базе и разбирает планы выполненных ими SQL-запросов"""
+
+    help = (
+        "replay api/v1 read actions and flag sequential scans, sorts and "
+        "non-covering index lookups in their query plans"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="ignore scans of tables with fewer rows",
+        )
+        parser.add_argument(
+            "--covering",
+            action="store_true",
+            help="also flag index lookups that read the table rows",
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="print full query plans"
+        )
+        parser.add_argument(
+            "--fail-on",
+            action="append",
+            choices=(SCAN, SORT, NOT_COVERING),
+            help="exit with an error if the flag is found (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(
+                f"EXPLAIN is not supported for {connection.vendor}"
+            )
+        admin = User.objects.filter(
+            Q(role=UserRoles.ADMIN) | Q(is_superuser=True)
+        ).first()
+        if admin is None:
+            raise CommandError("database has no admin user")
+        sizes = {
+            model._meta.db_table: model._default_manager.count()
+            for model in apps.get_models()
+        }
+        client = Client(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}"
+        )
+        totals = Counter()
+        # Свежий кеш: каждый ответ собирается из базы.
+        with override_settings(
+            CACHES=ISOLATED_CACHES, API_CACHE_ALIAS="default"
+        ):
+            for name, url in get_endpoints(get_samples(), admin):
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(url)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.stdout.write(
+                    f"{name} GET {url} -> {response.status_code}, "
+                    f"{len(context)} queries"
+                )
+                totals.update(
+                    self.report(
+                        context.captured_queries, explain, sizes, options
+                    )
+                )
+        summary = ", ".join(
+            f"{flag}: {count}" for flag, count in totals.items()
+        )
+        self.stdout.write(f"summary: {summary or 'clean'}")
+        failed = set(options["fail_on"] or ()) & set(totals)
+        if failed:
+            raise CommandError(f"found {', '.join(sorted(failed))}")
+
+    def report(self, queries, explain, sizes, options):
+        """Печатает замечания по SELECT-запросам и возвращает их счетчик."""
+        found = Counter()
+        min_rows = options["min_rows"]
+        with connection.cursor() as cursor:
+            for sql in dict.fromkeys(query["sql"] for query in queries):
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                flags, plan = explain(cursor, sql)
+                flags = [
+                    (flag, target)
+                    for flag, target in flags
+                    if (flag != SCAN or sizes.get(target, 0) >= min_rows)
+                    and (flag != NOT_COVERING or options["covering"])
+                ]
+                if not flags and not options["plans"]:
+                    continue
+                self.stdout.write(f"  {sql[:160]}")
+                for flag, target in flags:
+                    self.stdout.write(
+                        self.style.WARNING(f"    {flag}: {target}")
+                    )
+                    found[flag] += 1
+                if options["plans"]:
+                    for line in plan:
+                        self.stdout.write(f"    | {line}")
+        return found
@@ -0,0 +1,334 @@
+"""Команда нагрузочного замера горячих эндпоинтов API."""
+import json
+import math
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import django
+from api.v1.cache import bump_generation
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from reviews.models import Comment, Genre, Review, Title
+from users.models import User
+
+PERCENTILES = (50, 95, 99)
+CACHE_RESOURCES = (
+    "category",
+    "comment",
+    "genre",
+    "genretitle",
+    "review",
+    "title",
+    "user",
+)
+
+
+def percentile(values, rank):
+    """Процентиль методом ближайшего ранга по отсортированному списку."""
+    if not values:
+        return None
+    index = max(math.ceil(rank / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def client_address(number):
+    """Свой адрес на каждый запрос: замер не упирается в лимиты по IP."""
+    return f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+
+
+class Scenarios:
+    """Запросы замера: имя -> функция, возвращающая (метод, адрес, тело)."""
+
+    NAMES = (
+        "title_list",
+        "title_list_filtered",
+        "title_detail",
+        "reviews_deep_offset",
+        "comments_deep_offset",
+        "signup",
+        "token",
+    )
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.title_ids = list(Title.objects.values_list("id", flat=True))
+        self.genres = list(Genre.objects.values_list("slug", flat=True))
+        self.busy_title = (
+            Title.objects.order_by("-rating_count")
+            .values("id", "rating_count")
+            .first()
+        )
+        self.busy_review = (
+            Review.objects.values("id", "title_id")
+            .annotate(comment_count=Count("comments"))
+            .order_by("-comment_count")
+            .first()
+        )
+        self.users = list(
+            User.objects.order_by("id").only(
+                "id", "username", "password", "last_login", "email"
+            )[:1000]
+        )
+        self.signups = 0
+
+    def title_list(self):
+        return "get", "/api/v1/titles/", None
+
+    def title_list_filtered(self):
+        genre = self.rng.choice(self.genres)
+        return (
+            "get",
+            f"/api/v1/titles/?genre={genre}&ordering=-rating&limit=20",
+            None,
+        )
+
+    def title_detail(self):
+        title_id = self.rng.choice(self.title_ids)
+        return "get", f"/api/v1/titles/{title_id}/", None
+
+    def reviews_deep_offset(self):
+        title = self.busy_title
+        offset = max(title["rating_count"] - 5, 0)
+        return (
+            "get",
+            f"/api/v1/titles/{title['id']}/reviews/?limit=5&offset={offset}",
+            None,
+        )
+
+    def comments_deep_offset(self):
+        review = self.busy_review
+        offset = max(review["comment_count"] - 5, 0)
+        return (
+            "get",
+            f"/api/v1/titles/{review['title_id']}/reviews/{review['id']}"
+            f"/comments/?limit=5&offset={offset}",
+            None,
+        )
+
+    def signup(self):
+        self.signups += 1
+        name = f"bench{time.time_ns()}x{self.signups}"
+        return (
+            "post",
+            "/api/v1/auth/signup/",
+            {"username": name, "email": f"{name}@example.com"},
+        )
+
+    def token(self):
+        user = self.rng.choice(self.users)
+        return (
+            "post",
+            "/api/v1/auth/token/",
+            {
+                "username": user.username,
+                "confirmation_code": default_token_generator.make_token(user),
+            },
+        )
+
+
+def p95_change(before, after):
+    """Изменение p95 в процентах; None, если базовое значение нулевое."""
+    if not before:
+        return None
+    return (after / before - 1) * 100
+
+
+class Command(BaseCommand):
+    """Команда замера задержек, числа запросов к базе и пропускной
+    способности API на синтетических данных"""
+
+    help = "benchmark hot API endpoints on a seeded test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--titles", type=int, default=1000)
+        parser.add_argument("--reviews", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="measured requests per scenario",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=10,
+            help="unmeasured requests per scenario",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--cache",
+            choices=("cold", "warm"),
+            default="cold",
+            help="cold invalidates cached API responses before each request",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            help="run only the named scenario (repeatable)",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="reuse the seeded test database between runs",
+        )
+        parser.add_argument("--output", help="write results as JSON")
+        parser.add_argument(
+            "--baseline", help="JSON of a previous run to compare against"
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="fail if p95 grows by more than this many percent",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["warmup"] < 0:
+            raise CommandError(
+                "--requests must be positive and --warmup non-negative"
+            )
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            if not Title.objects.exists():
+                call_command(
+                    "generate_data",
+                    titles=options["titles"],
+                    reviews=options["reviews"],
+                    comments=options["comments"],
+                    seed=options["seed"],
+                    stdout=self.stdout,
+                )
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+        if options["baseline"]:
+            self.compare(report, options)
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        scenarios = Scenarios(rng)
+        names = options["scenario"] or Scenarios.NAMES
+        unknown = set(names) - set(Scenarios.NAMES)
+        if unknown:
+            raise CommandError(f"unknown scenarios: {', '.join(unknown)}")
+        report = {
+            "meta": {
+                "date": datetime.now(timezone.utc).isoformat(),
+                "vendor": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "titles": Title.objects.count(),
+                "reviews": Review.objects.count(),
+                "comments": Comment.objects.count(),
+                "requests": options["requests"],
+                "cache": options["cache"],
+                "seed": options["seed"],
+            },
+            "scenarios": {},
+        }
+        for name in names:
+            report["scenarios"][name] = self.measure(
+                getattr(scenarios, name), options
+            )
+        return report
+
+    def measure(self, make_request, options):
+        """Последовательно выполняет запросы сценария и снимает метрики."""
+        client = Client()
+        latencies, queries, errors = [], [], 0
+        total = options["warmup"] + options["requests"]
+        started = None
+        for number in range(total):
+            method, url, data = make_request()
+            if options["cache"] == "cold":
+                bump_generation(*CACHE_RESOURCES)
+            if number == options["warmup"]:
+                started = time.perf_counter()
+            extra = {"REMOTE_ADDR": client_address(number)}
+            with CaptureQueriesContext(connection) as context:
+                begin = time.perf_counter()
+                if data is None:
+                    response = getattr(client, method)(url, **extra)
+                else:
+                    response = getattr(client, method)(
+                        url, data, content_type="application/json", **extra
+                    )
+                elapsed = time.perf_counter() - begin
+            if number < options["warmup"]:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(len(context))
+            if response.status_code >= 400:
+                errors += 1
+        duration = time.perf_counter() - started
+        latencies.sort()
+        result = {
+            f"p{rank}_ms": round(percentile(latencies, rank), 3)
+            for rank in PERCENTILES
+        }
+        result.update(
+            mean_ms=round(sum(latencies) / len(latencies), 3),
+            queries_per_request=round(sum(queries) / len(queries), 2),
+            throughput_rps=round(len(latencies) / duration, 1),
+            errors=errors,
+        )
+        return result
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'scenario':24}{'p50':>9}{'p95':>9}{'p99':>9}"
+            f"{'queries':>9}{'rps':>9}{'errors':>8}"
+        )
+        for name, result in report["scenarios"].items():
+            self.stdout.write(
+                f"{name:24}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries_per_request']:>9}"
+                f"{result['throughput_rps']:>9}{result['errors']:>8}"
+            )
+
+    def compare(self, report, options):
+        """Сравнивает p95 и число запросов с сохраненным прогоном."""
+        with open(options["baseline"], encoding="utf-8") as file:
+            baseline = json.load(file)["scenarios"]
+        regressions = []
+        for name, result in report["scenarios"].items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = p95_change(before["p95_ms"], result["p95_ms"])
+            self.stdout.write(
+                f"{name:24}p95 {before['p95_ms'] or 0:.2f} -> "
+                f"{result['p95_ms']:.2f} ms "
+                f"({'n/a' if change is None else f'{change:+.1f}%'}), "
+                f"queries {before['queries_per_request']} -> "
+                f"{result['queries_per_request']}"
+            )
+            limit = options["max_regression"]
+            if limit is not None and change is not None and change > limit:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"p95 regression over {options['max_regression']}%: "
+                f"{', '.join(regressions)}"
+            )
@@ -0,0 +1,139 @@
+"""Команда микрозамера быстрого пути сериализаторов списков."""
+import time
+from datetime import datetime, timedelta, timezone
+
+from api.v1.fastpath import get_fast_serializer
+from api.v1.serializers import (
+    CommentSerializer,
+    ReviewSerializer,
+    TitleSerializer,
+)
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+STARTED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_titles(count):
+    categories = [
+        Category(id=number, name=f"Category {number}", slug=f"c{number}")
+        for number in range(1, 4)
+    ]
+    genres = [
+        Genre(id=number, name=f"Genre {number}", slug=f"g{number}")
+        for number in range(1, 6)
+    ]
+    titles = []
+    for number in range(1, count + 1):
+        title = Title(
+            id=number,
+            name=f"Title {number}",
+            year=1950 + number % 70,
+            description=f"Description of title {number}",
+            category=categories[number % len(categories)],
+        )
+        title.rating = number % 100 / 10
+        title._prefetched_objects_cache = {
+            "genre": genres[: number % 3 + 1]
+        }
+        titles.append(title)
+    return titles
+
+
+def make_reviews(count):
+    users = [User(id=number, username=f"u{number}") for number in range(50)]
+    return [
+        Review(
+            id=number,
+            author=users[number % len(users)],
+            title_id=number % 100 + 1,
+            text=f"Review text {number}",
+            score=number % 10 + 1,
+            pub_date=STARTED + timedelta(seconds=number),
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+def make_comments(count):
+    users = [User(id=number, username=f"u{number}") for number in range(50)]
+    return [
+        Comment(
+            id=number,
+            author=users[number % len(users)],
+            review_id=number % 100 + 1,
+            text=f"Comment text {number}",
+            pub_date=STARTED + timedelta(seconds=number),
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+CASES = {
+    "titles": (TitleSerializer, make_titles),
+    "reviews": (ReviewSerializer, make_reviews),
+    "comments": (CommentSerializer, make_comments),
+}
+
+
+def best_time(function, repeat):
+    """Лучшее время из repeat прогонов, в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - begin)
+    return min(timings) * 1000
+
+
+class Command(BaseCommand):
+    """Команда сравнения DRF и скомпилированных сериализаторов на
+    объектах в памяти, без базы данных"""
+
+    help = "compare DRF and compiled list serializers per 1k rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="runs per case, the best one is reported",
+        )
+
+    def handle(self, *args, **options):
+        rows_count, repeat = options["rows"], options["repeat"]
+        if rows_count < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be positive")
+        scale = 1000 / rows_count
+        self.stdout.write(
+            f"{'serializer':12}{'drf ms/1k':>12}{'fast ms/1k':>12}"
+            f"{'speedup':>10}"
+        )
+        for name, (serializer_class, make_objects) in CASES.items():
+            objs = make_objects(rows_count)
+            serializer = serializer_class(
+                objs, many=True, context={"sparse": None}
+            )
+            fast = get_fast_serializer(serializer.child)
+            rows, related_rows = fast.rows_from_objects(objs)
+            renderer = JSONRenderer()
+            if renderer.render(fast.build(rows, related_rows)) != (
+                renderer.render(serializer.data)
+            ):
+                raise CommandError(f"{name}: fast output differs from DRF")
+            drf = best_time(
+                lambda: serializer_class(
+                    objs, many=True, context={"sparse": None}
+                ).data,
+                repeat,
+            )
+            compiled = best_time(
+                lambda: fast.build(rows, related_rows), repeat
+            )
+            self.stdout.write(
+                f"{name:12}{drf * scale:>12.2f}{compiled * scale:>12.2f}"
+                f"{drf / compiled:>9.1f}x"
+            )
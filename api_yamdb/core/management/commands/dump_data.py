@@ -0,0 +1,229 @@
+"""Команда выгрузки базы в csv в формате load_data."""
+import csv
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import F, Q
+from django.db.models.functions import Mod
+from reviews.models import Comment, GenreTitle, Review, Title
+from users.models import User
+
+from .load_data import COLUMNS, DATA
+
+# Мультипликативный хеш Кнута: выборка по id детерминирована и равномерна.
+SAMPLE_HASH = 2654435761
+SAMPLE_BUCKETS = 10000
+
+
+def sampled(queryset, fraction, seed, also=None):
+    """Строки, попавшие в выборку по хешу ключа или под условие also."""
+    condition = Q(sample_bucket__lt=round(fraction * SAMPLE_BUCKETS))
+    if also is not None:
+        condition |= also
+    return queryset.annotate(
+        sample_bucket=Mod(F("pk") * SAMPLE_HASH + seed, SAMPLE_BUCKETS)
+    ).filter(condition)
+
+
+def get_querysets(fraction=1.0, seed=0):
+    """
+    Выгружаемые строки каждой модели.
+
+    Выборка делается по произведениям, остальное тянется по ссылкам:
+    жанры и отзывы выбранных произведений, комментарии к этим отзывам,
+    их авторы. Категории и жанры выгружаются целиком.
+    """
+    querysets = {model: model._default_manager.all() for model in DATA}
+    if fraction >= 1:
+        return querysets
+    titles = sampled(Title.objects.all(), fraction, seed)
+    reviews = Review.objects.filter(title__in=titles.values("pk"))
+    comments = Comment.objects.filter(review__in=reviews.values("pk"))
+    querysets.update(
+        {
+            User: sampled(
+                User.objects.all(),
+                fraction,
+                seed,
+                also=Q(pk__in=reviews.values("author"))
+                | Q(pk__in=comments.values("author")),
+            ),
+            Title: titles,
+            GenreTitle: GenreTitle.objects.filter(
+                title__in=titles.values("pk")
+            ),
+            Review: reviews,
+            Comment: comments,
+        }
+    )
+    return querysets
+
+
+def format_value(value):
+    """Значение поля в виде, который разбирает load_data."""
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def dump_table(label, path, options):
+    """Выгружает одну таблицу; выполняется в отдельном процессе."""
+    started = time.monotonic()
+    model = apps.get_model(label)
+    fields = [model._meta.get_field(name) for name in COLUMNS[model]]
+    queryset = (
+        get_querysets(options["fraction"], options["seed"])[model]
+        .order_by("pk")
+        .values_list(*(field.attname for field in fields))
+    )
+    temporary = f"{path}.part"
+    if options["gzip"]:
+        file = gzip.open(temporary, "wt", encoding="utf-8", newline="")
+    else:
+        file = open(temporary, "w", encoding="utf-8", newline="")
+    try:
+        with file:
+            if connection.vendor == "postgresql":
+                rows = copy_to(file, queryset, COLUMNS[model], fields)
+            else:
+                rows = write_rows(
+                    file, queryset, COLUMNS[model], options["chunk_size"]
+                )
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        connections.close_all()
+    return label, path, rows, time.monotonic() - started
+
+
+def write_rows(file, queryset, header, chunk_size):
+    """Запись через серверный курсор пачками по chunk_size строк."""
+    writer = csv.writer(file)
+    writer.writerow(header)
+    rows = 0
+    for row in queryset.iterator(chunk_size=chunk_size):
+        writer.writerow(format_value(value) for value in row)
+        rows += 1
+    return rows
+
+
+def copy_to(file, queryset, header, fields):
+    """Запись через COPY TO STDOUT (только PostgreSQL)."""
+    quote = connection.ops.quote_name
+    sql, params = queryset.query.sql_with_params()
+    select = ", ".join(
+        f"{quote(field.column)} AS {quote(name)}"
+        for name, field in zip(header, fields)
+    )
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(sql, params).decode()
+        cursor.copy_expert(
+            f"COPY (SELECT {select} FROM ({query}) AS dump) "
+            "TO STDOUT WITH (FORMAT csv, HEADER)",
+            file,
+        )
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    """Команда для выгрузки данных в csv файлы"""
+
+    help = "dump data to csv files in the load_data layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir",
+            default=os.path.dirname(next(iter(DATA.values()))),
+            help="directory for the csv files",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=min(os.cpu_count() or 1, len(DATA)),
+            help="tables dumped in parallel processes",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="write csv.gz files (load_data reads them as well)",
+        )
+        parser.add_argument(
+            "--fraction",
+            type=float,
+            default=1.0,
+            help="share of titles to keep, with everything they reference",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="changes which rows --fraction picks",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="rows fetched per round trip without COPY",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="overwrite existing files",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options["fraction"] <= 1:
+            raise CommandError("--fraction must be in (0, 1]")
+        output_dir = options["output_dir"]
+        os.makedirs(output_dir, exist_ok=True)
+        suffix = ".gz" if options["gzip"] else ""
+        tables = [
+            (
+                model._meta.label,
+                os.path.join(output_dir, os.path.basename(file) + suffix),
+            )
+            for model, file in DATA.items()
+        ]
+        existing = [path for _, path in tables if os.path.exists(path)]
+        if existing and not options["force"]:
+            raise CommandError(
+                f"{', '.join(existing)} already exist, use --force"
+            )
+        dump_options = {
+            name: options[name]
+            for name in ("fraction", "seed", "gzip", "chunk_size")
+        }
+        if options["jobs"] <= 1:
+            results = [
+                dump_table(label, path, dump_options)
+                for label, path in tables
+            ]
+        else:
+            results = self.dump_parallel(
+                tables, dump_options, options["jobs"]
+            )
+        for label, path, rows, elapsed in results:
+            self.stdout.write(f"{path}: {rows} rows in {elapsed:.1f}s")
+        self.stdout.write(self.style.SUCCESS("done"))
+
+    def dump_parallel(self, tables, options, jobs):
+        """Таблицы независимы, поэтому выгружаются в пуле процессов."""
+        # Дочерние процессы не должны делить открытые соединения.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=django.setup
+        ) as pool:
+            futures = [
+                pool.submit(dump_table, label, path, options)
+                for label, path in tables
+            ]
+            return [future.result() for future in as_completed(futures)]
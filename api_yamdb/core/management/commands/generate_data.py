@@ -0,0 +1,475 @@
+"""Команда генерации синтетического каталога production-размера."""
+import csv
+import io
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from api.v1.cache import bump_generation
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import User
+
+from .load_data import preserve_auto_now
+
+WORDS = (
+    "time year people way day man thing woman life child world school "
+    "state family student group country problem hand part place case week "
+    "company system program question work government number night point "
+    "home water room mother area money story fact month lot right study "
+    "book eye job word business issue side kind head house service friend "
+    "father power hour game line end member law car city community name "
+    "president team minute idea kid body information back parent face "
+    "others level office door health person art war history party result "
+    "change morning reason research girl guy moment air teacher force "
+    "education dark silent river golden broken last first lost secret "
+    "great little old new long young strange wild quiet bright cold"
+).split()
+
+GENRES_PER_TITLE = ((1, 2, 3, 4), (50, 30, 15, 5))
+SCORES = (range(1, 11), (2, 2, 3, 4, 6, 9, 14, 16, 12, 7))
+HISTORY_DAYS = 5 * 365
+
+
+def zipf_weights(count, exponent):
+    """Веса рангов 1..count по закону Ципфа."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def zipf_counts(total, count, exponent, cap, rng):
+    """
+    Делит total между count объектами по Ципфу, не больше cap на объект.
+
+    Ранги перемешиваются, чтобы популярные объекты не шли подряд по id.
+    """
+    if count == 0:
+        return []
+    weights = zipf_weights(count, exponent)
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    if cap is not None:
+        counts = [min(value, cap) for value in counts]
+    missing = total - sum(counts)
+    for rank in itertools.cycle(range(count)):
+        if missing <= 0:
+            break
+        if cap is None or counts[rank] < cap:
+            counts[rank] += 1
+            missing -= 1
+    rng.shuffle(counts)
+    return counts
+
+
+def sentence(rng, mean_words, sigma, longest):
+    """Текст с логнормальной длиной: много коротких, редкие длинные."""
+    words = int(rng.lognormvariate(math.log(mean_words), sigma))
+    words = min(max(words, 1), longest)
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def past_date(rng, now):
+    return now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+
+
+def weighted_sample(rng, population, cum_weights, size):
+    """Выборка без повторов с учетом весов."""
+    chosen = set()
+    while len(chosen) < size:
+        chosen.update(
+            rng.choices(population, cum_weights=cum_weights, k=size)
+        )
+    return list(chosen)[:size]
+
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def users_rows(rng, start, stop, config):
+    for user_id in range(start, stop):
+        if user_id == 1:
+            role = "admin"
+        elif rng.random() < 0.01:
+            role = "moderator"
+        else:
+            role = "user"
+        yield (
+            user_id,
+            f"user{user_id}",
+            f"user{user_id}@example.com",
+            role,
+            sentence(rng, 8, 0.6, 40) if rng.random() < 0.3 else "",
+            "",
+            False,
+            False,
+            True,
+            config["now"] - timedelta(days=rng.randrange(HISTORY_DAYS)),
+        )
+
+
+def categories_rows(rng, start, stop, config):
+    for category_id in range(start, stop):
+        yield category_id, f"Category {category_id}", f"category-{category_id}"
+
+
+def genres_rows(rng, start, stop, config):
+    for genre_id in range(start, stop):
+        yield genre_id, f"Genre {genre_id}", f"genre-{genre_id}"
+
+
+def titles_rows(rng, start, stop, config):
+    categories = range(1, config["categories"] + 1)
+    for title_id in range(start, stop):
+        words = rng.choices(WORDS, k=rng.randint(1, 4))
+        yield (
+            title_id,
+            # id в названии гарантирует unique_name_category.
+            f"{' '.join(words).title()} {title_id}",
+            rng.randint(1900, config["now"].year),
+            rng.choices(categories, cum_weights=config["category_weights"])[
+                0
+            ],
+            sentence(rng, 40, 0.7, 400),
+            config["now"],
+        )
+
+
+def genre_title_rows(rng, start, stop, config):
+    genres = range(1, config["genres"] + 1)
+    sizes, size_weights = GENRES_PER_TITLE
+    for title_id in range(start, stop):
+        size = min(rng.choices(sizes, size_weights)[0], config["genres"])
+        for genre_id in weighted_sample(
+            rng, genres, config["genre_weights"], size
+        ):
+            yield title_id, genre_id
+
+
+def reviews_rows(rng, start, stop, config):
+    """Отзывы произведений start..stop-1, авторы без повторов."""
+    review_id = config["first_id"]
+    scores, score_weights = SCORES
+    users = range(1, config["users"] + 1)
+    for title_id, count in zip(range(start, stop), config["counts"]):
+        for author_id in rng.sample(users, count):
+            yield (
+                review_id,
+                title_id,
+                author_id,
+                sentence(rng, 60, 0.8, 1000),
+                rng.choices(scores, score_weights)[0],
+                past_date(rng, config["now"]),
+            )
+            review_id += 1
+
+
+def comments_rows(rng, start, stop, config):
+    comment_id = config["first_id"]
+    for review_id, count in zip(range(start, stop), config["counts"]):
+        for _ in range(count):
+            yield (
+                comment_id,
+                review_id,
+                rng.randint(1, config["users"]),
+                sentence(rng, 15, 0.7, 300),
+                past_date(rng, config["now"]),
+            )
+            comment_id += 1
+
+
+TABLES = {
+    "users": (
+        User,
+        (
+            "id",
+            "username",
+            "email",
+            "role",
+            "bio",
+            "password",
+            "is_superuser",
+            "is_staff",
+            "is_active",
+            "date_joined",
+        ),
+        users_rows,
+    ),
+    "categories": (Category, ("id", "name", "slug"), categories_rows),
+    "genres": (Genre, ("id", "name", "slug"), genres_rows),
+    "titles": (
+        Title,
+        ("id", "name", "year", "category_id", "description", "updated"),
+        titles_rows,
+    ),
+    "genre_title": (GenreTitle, ("title_id", "genre_id"), genre_title_rows),
+    "reviews": (
+        Review,
+        ("id", "title_id", "author_id", "text", "score", "pub_date"),
+        reviews_rows,
+    ),
+    "comments": (
+        Comment,
+        ("id", "review_id", "author_id", "text", "pub_date"),
+        comments_rows,
+    ),
+}
+
+
+def write_rows(model, attnames, rows):
+    """Пачка строк в базу: COPY на PostgreSQL, иначе bulk_create."""
+    objs = [model(**dict(zip(attnames, row))) for row in rows]
+    with transaction.atomic():
+        if connection.vendor != "postgresql":
+            with preserve_auto_now(model):
+                model.objects.bulk_create(objs)
+            return
+        # Остальные поля заполняются значениями по умолчанию модели.
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if field.attname in attnames or not field.primary_key
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objs:
+            writer.writerow(
+                "\\N"
+                if getattr(obj, field.attname) is None
+                else field.get_db_prep_save(
+                    getattr(obj, field.attname), connection
+                )
+                for field in fields
+            )
+        buffer.seek(0)
+        names = ", ".join(
+            connection.ops.quote_name(field.column) for field in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+                f"({names}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+
+def init_worker(database_name):
+    """Процесс пула пишет в ту же базу, что и команда (и тестовую)."""
+    django.setup()
+    connection.settings_dict["NAME"] = database_name
+
+
+def generate_chunk(table, start, stop, seed, config):
+    """
+    Генерирует строки таблицы для ключей start..stop-1.
+
+    PostgreSQL принимает параллельную запись, и процесс пишет сам; для
+    остальных бэкендов строки возвращаются и записываются командой.
+    """
+    model, attnames, generator = TABLES[table]
+    rows = list(generator(random.Random(seed), start, stop, config))
+    if connection.vendor == "postgresql":
+        write_rows(model, attnames, rows)
+        return table, len(rows), None
+    return table, len(rows), rows
+
+
+class Command(BaseCommand):
+    """Команда для генерации синтетических данных"""
+
+    help = "generate a realistic synthetic catalog with skewed distributions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--genres", type=int, default=100)
+        parser.add_argument("--titles", type=int, default=10000)
+        parser.add_argument("--reviews", type=int, default=200000)
+        parser.add_argument("--comments", type=int, default=500000)
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.0,
+            help="exponent of reviews per title and comments per review",
+        )
+        parser.add_argument(
+            "--genre-skew",
+            type=float,
+            default=1.2,
+            help="exponent of genre and category popularity",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="generator processes; 1 runs in the current process",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=20000,
+            help="rows generated per task",
+        )
+
+    def handle(self, *args, **options):
+        users = options["users"] or max(
+            1000, options["reviews"] // 20, options["comments"] // 50
+        )
+        for model, _, _ in TABLES.values():
+            if model.objects.exists():
+                raise CommandError(
+                    f"{model._meta.db_table} is not empty, run flush first"
+                )
+        rng = random.Random(options["seed"])
+        title_counts = zipf_counts(
+            options["reviews"],
+            options["titles"],
+            options["zipf"],
+            users,
+            rng,
+        )
+        if sum(title_counts) != options["reviews"]:
+            raise CommandError(
+                "--reviews exceeds one review per user for every title"
+            )
+        comment_counts = zipf_counts(
+            options["comments"] if options["reviews"] else 0,
+            options["reviews"],
+            options["zipf"],
+            None,
+            rng,
+        )
+        config = {
+            "now": timezone.now(),
+            "users": users,
+            "categories": options["categories"],
+            "genres": options["genres"],
+            "category_weights": cumulative(
+                zipf_weights(options["categories"], options["genre_skew"])
+            ),
+            "genre_weights": cumulative(
+                zipf_weights(options["genres"], options["genre_skew"])
+            ),
+        }
+        chunk = options["chunk_size"]
+        sizes = dict(options, users=users)
+        tasks = {
+            table: self.tasks(table, sizes[key], chunk, config)
+            for table, key in (
+                ("users", "users"),
+                ("categories", "categories"),
+                ("genres", "genres"),
+                ("titles", "titles"),
+                ("genre_title", "titles"),
+            )
+        }
+        tasks["reviews"] = self.counted_tasks(
+            "reviews", title_counts, chunk, config
+        )
+        tasks["comments"] = self.counted_tasks(
+            "comments", comment_counts, chunk, config
+        )
+        phases = [
+            tasks["users"] + tasks["categories"] + tasks["genres"],
+            tasks["titles"],
+            tasks["genre_title"] + tasks["reviews"],
+            tasks["comments"],
+        ]
+        started = time.monotonic()
+        totals = self.run(phases, options)
+        self.finish()
+        for table, rows in totals.items():
+            self.stdout.write(f"{table}: {rows} rows")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"done: {sum(totals.values())} rows in "
+                f"{time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def tasks(self, table, count, chunk, config):
+        """Задачи по диапазонам ключей 1..count."""
+        return [
+            (table, start, min(start + chunk, count + 1), config)
+            for start in range(1, count + 1, chunk)
+        ]
+
+    def counted_tasks(self, table, counts, chunk, config):
+        """
+        Задачи по родителям с заданным числом дочерних строк.
+
+        Ключи дочерних строк идут подряд, поэтому каждая задача получает
+        первый свободный id и число строк для каждого своего родителя.
+        """
+        tasks = []
+        first_id = begin = 0
+        while begin < len(counts):
+            end = begin + 1
+            rows = counts[begin]
+            while end < len(counts) and rows < chunk:
+                rows += counts[end]
+                end += 1
+            task_config = dict(
+                config, first_id=first_id + 1, counts=counts[begin:end]
+            )
+            tasks.append((table, begin + 1, end + 1, task_config))
+            first_id += rows
+            begin = end
+        return tasks
+
+    def run(self, phases, options):
+        """Фазы идут по порядку внешних ключей, задачи фазы параллельно."""
+        totals = dict.fromkeys(TABLES, 0)
+        seeds = itertools.count(options["seed"] * 1000003)
+        if options["workers"] <= 1:
+            for phase in phases:
+                for table, start, stop, config in phase:
+                    result = generate_chunk(
+                        table, start, stop, next(seeds), config
+                    )
+                    self.store(result, totals)
+            return totals
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            initializer=init_worker,
+            initargs=(connection.settings_dict["NAME"],),
+        ) as pool:
+            for phase in phases:
+                futures = [
+                    pool.submit(
+                        generate_chunk, table, start, stop, next(seeds), config
+                    )
+                    for table, start, stop, config in phase
+                ]
+                for future in futures:
+                    self.store(future.result(), totals)
+        return totals
+
+    def store(self, result, totals):
+        """Учитывает готовую задачу и пишет ее строки, если нужно."""
+        table, count, rows = result
+        if rows is not None:
+            model, attnames, _ = TABLES[table]
+            write_rows(model, attnames, rows)
+        totals[table] += count
+        self.stdout.write(f"{table}: {totals[table]} rows", ending="\r")
+
+    def finish(self):
+        """Сдвигает последовательности, считает рейтинги, сбрасывает кеш."""
+        models = [model for model, _, _ in TABLES.values()]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        call_command("rebuild_ratings", stdout=io.StringIO())
+        call_command("rebuild_leaderboards", stdout=io.StringIO())
+        bump_generation(*(model._meta.model_name for model in models))
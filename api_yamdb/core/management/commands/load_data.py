@@ -1,7 +1,20 @@
 """Команды для работы с базой данных."""
 import csv
+import gzip
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
 
-from django.core.management.base import BaseCommand
+from api.v1.cache import bump_generation
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from django.db.models import AutoField
+from django.utils import timezone
 from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
 from users.models import User
 
@@ -15,19 +28,275 @@ DATA = {
     Comment: "static/data/comments.csv",
 }
 
+# Колонки выгрузки dump_data. Загрузка сопоставляет колонки по заголовку,
+# поэтому файлы без части колонок (например, titles.csv без description)
+# по-прежнему загружаются: недостающие поля получают значения по умолчанию.
+COLUMNS = {
+    User: (
+        "id",
+        "username",
+        "email",
+        "role",
+        "bio",
+        "first_name",
+        "last_name",
+    ),
+    Category: ("id", "name", "slug"),
+    Genre: ("id", "name", "slug"),
+    Title: ("id", "name", "year", "description", "category"),
+    GenreTitle: ("id", "title_id", "genre_id"),
+    Review: ("id", "title_id", "text", "author", "score", "pub_date"),
+    Comment: ("id", "review_id", "text", "author", "pub_date"),
+}
+
+CHECKPOINT = "static/data/.load_data.checkpoint"
+
+
+def open_data_file(file):
+    """Открывает csv или, если его нет, сжатый рядом file.gz."""
+    if not os.path.exists(file) and os.path.exists(f"{file}.gz"):
+        return gzip.open(f"{file}.gz", "rt", encoding="utf-8-sig", newline="")
+    return open(file, "r", encoding="utf-8-sig", newline="")
+
+
+@contextmanager
+def preserve_auto_now(model):
+    """Не дает auto_now/auto_now_add затирать даты из файла."""
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False)
+        or getattr(field, "auto_now_add", False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
 
 class Command(BaseCommand):
     """Команда для загрузки данных из csv файлов"""
 
     help = "load data from csv"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="rows per bulk insert",
+        )
+        parser.add_argument(
+            "--ignore-conflicts",
+            action="store_true",
+            help="skip rows that violate unique constraints",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="use bulk_create even when PostgreSQL COPY is available",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="skip files already loaded by a previous interrupted run",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=CHECKPOINT,
+            help="file that records fully loaded csv files",
+        )
+
     def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.ignore_conflicts = options["ignore_conflicts"]
+        self.use_copy = (
+            connection.vendor == "postgresql"
+            and not options["no_copy"]
+            and not self.ignore_conflicts
+        )
+        checkpoint = options["checkpoint"]
+        done = self.read_checkpoint(checkpoint) if options["resume"] else []
         for model, file in DATA.items():
-            with open(file, "r", encoding="utf-8-sig") as csv_file:
-                csv_reader = csv.DictReader(csv_file, delimiter=",")
-                for row in csv_reader:
-                    try:
-                        model.objects.get_or_create(**row)
-                        print(f"{file}: {row}")
-                    except Exception as error:
-                        print(f"Error {error} in file {file}, row{row}")
+            if file in done:
+                self.stdout.write(f"{file}: already loaded, skipping")
+                continue
+            self.load_file(model, file)
+            done.append(file)
+            self.write_checkpoint(checkpoint, done)
+        call_command("rebuild_ratings", stdout=io.StringIO())
+        call_command("rebuild_leaderboards", stdout=io.StringIO())
+        bump_generation(*(model._meta.model_name for model in DATA))
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS("done"))
+
+    def read_checkpoint(self, path):
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def write_checkpoint(self, path, done):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(done, file)
+
+    def get_columns(self, model, header):
+        """Сопоставляет колонки файла полям модели (author -> author_id)."""
+        columns = []
+        for name in header:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise CommandError(
+                    f"{model.__name__} has no field for column {name!r}"
+                )
+            columns.append((name, field))
+        return columns
+
+    def get_defaults(self, model, columns):
+        """Значения полей, которых нет в файле: как при создании модели."""
+        present = {field.attname for _, field in columns}
+        now = timezone.now()
+        defaults = {}
+        for field in model._meta.concrete_fields:
+            if field.attname in present or isinstance(field, AutoField):
+                continue
+            if getattr(field, "auto_now", False) or getattr(
+                field, "auto_now_add", False
+            ):
+                defaults[field.attname] = now
+            else:
+                defaults[field.attname] = field.get_default()
+        return defaults
+
+    def get_id_maps(self, model):
+        """Множества существующих ключей для проверки внешних ключей."""
+        return {
+            field.attname: set(
+                field.related_model._default_manager.values_list(
+                    field.target_field.attname, flat=True
+                )
+            )
+            for field in model._meta.concrete_fields
+            if field.is_relation
+        }
+
+    def convert_row(self, row, columns, defaults, id_maps):
+        """Строка файла -> значения полей модели по attname."""
+        values = dict(defaults)
+        for name, field in columns:
+            raw = row[name]
+            if raw == "" and field.null:
+                value = None
+            elif field.is_relation:
+                value = int(raw)
+                if value not in id_maps[field.attname]:
+                    raise ValidationError(
+                        f"{field.related_model.__name__} {value} not found"
+                    )
+            else:
+                value = field.to_python(raw)
+            values[field.attname] = value
+        return values
+
+    def load_file(self, model, file):
+        """Загружает один файл пачками в отдельной транзакции."""
+        started = time.monotonic()
+        loaded = skipped = 0
+        with open_data_file(file) as csv_file:
+            reader = csv.DictReader(csv_file, delimiter=",")
+            columns = self.get_columns(model, reader.fieldnames)
+            defaults = self.get_defaults(model, columns)
+            id_maps = self.get_id_maps(model)
+            batch = []
+            try:
+                with transaction.atomic(), preserve_auto_now(model):
+                    for line, row in enumerate(reader, start=2):
+                        try:
+                            batch.append(
+                                self.convert_row(
+                                    row, columns, defaults, id_maps
+                                )
+                            )
+                        except (ValidationError, ValueError) as error:
+                            skipped += 1
+                            self.stderr.write(
+                                f"{file}:{line}: {error}, row {row}"
+                            )
+                            continue
+                        if len(batch) >= self.batch_size:
+                            loaded += self.flush(model, batch)
+                            batch = []
+                            self.report(file, loaded, started)
+                    loaded += self.flush(model, batch)
+                    self.reset_sequences(model)
+            except DatabaseError as error:
+                raise CommandError(
+                    f"{file}: {error}; nothing from this file was saved, "
+                    "rerun with --resume after fixing it"
+                )
+        self.report(file, loaded, started, ending="\n")
+        if skipped:
+            self.stderr.write(f"{file}: skipped {skipped} invalid rows")
+
+    def flush(self, model, batch):
+        """Записывает пачку строк через COPY или bulk_create."""
+        if not batch:
+            return 0
+        if self.use_copy:
+            self.copy(model, batch)
+        else:
+            model.objects.bulk_create(
+                [model(**values) for values in batch],
+                batch_size=self.batch_size,
+                ignore_conflicts=self.ignore_conflicts,
+            )
+        return len(batch)
+
+    def copy(self, model, batch):
+        """Пачка строк через COPY FROM STDIN (только PostgreSQL)."""
+        fields = {
+            field.attname: field for field in model._meta.concrete_fields
+        }
+        attnames = list(batch[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for values in batch:
+            writer.writerow(
+                "\\N"
+                if values[attname] is None
+                else fields[attname].get_db_prep_save(
+                    values[attname], connection
+                )
+                for attname in attnames
+            )
+        buffer.seek(0)
+        names = ", ".join(
+            connection.ops.quote_name(fields[attname].column)
+            for attname in attnames
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+                f"({names}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+    def reset_sequences(self, model):
+        """Сдвигает автоинкремент за загруженные явные id."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def report(self, file, loaded, started, ending="\r"):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"{file}: {loaded} rows, {loaded / elapsed:.0f} rows/s",
+            ending=ending,
+        )
@@ -0,0 +1,126 @@
+"""Команда отправки писем из очереди."""
+import time
+from datetime import timedelta
+
+from core.models import OutgoingEmail
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+UPDATE_FIELDS = (
+    "status",
+    "attempts",
+    "next_attempt_at",
+    "last_error",
+    "sent_at",
+)
+
+
+class Command(BaseCommand):
+    """Воркер, который отправляет письма из outbox пачками"""
+
+    help = "send queued emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="emails per batch"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=8,
+            help="attempts before an email is marked failed",
+        )
+        parser.add_argument(
+            "--backoff",
+            type=float,
+            default=30,
+            help="base retry delay in seconds, doubled after each failure",
+        )
+        parser.add_argument(
+            "--lease",
+            type=float,
+            default=300,
+            help="seconds a claimed batch is hidden from other workers",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="drain the queue once and exit",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.mail_connection = get_connection()
+        try:
+            while True:
+                processed = self.process_batch()
+                if processed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            self.mail_connection.close()
+
+    def claim_batch(self):
+        """Забирает пачку писем в короткой транзакции.
+
+        Письма откладываются на --lease секунд, и другие воркеры их не
+        видят, пока идет отправка. Если воркер упадет, не отметив их,
+        письма снова станут доступны по истечении этого срока.
+        """
+        with transaction.atomic():
+            queryset = OutgoingEmail.objects.due()
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            batch = list(queryset[: self.options["batch_size"]])
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in batch]
+            ).update(
+                next_attempt_at=timezone.now()
+                + timedelta(seconds=self.options["lease"])
+            )
+        return batch
+
+    def send(self, email):
+        """Отправляет письмо через общее SMTP-соединение."""
+        message = EmailMessage(
+            email.subject,
+            email.body,
+            settings.DEFAULT_FROM_EMAIL,
+            [email.recipient],
+            connection=self.mail_connection,
+        )
+        try:
+            self.mail_connection.open()
+            message.send()
+        except Exception as error:
+            email.mark_failed(
+                error, self.options["max_attempts"], self.options["backoff"]
+            )
+            self.mail_connection.close()
+            return False
+        email.mark_sent()
+        return True
+
+    def process_batch(self):
+        """Отправляет одну пачку писем вне транзакции и блокировок."""
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+        sent = sum(self.send(email) for email in batch)
+        OutgoingEmail.objects.bulk_update(batch, UPDATE_FIELDS)
+        lag = OutgoingEmail.objects.queue_lag()
+        self.stdout.write(
+            f"sent {sent}, failed {len(batch) - sent}, queue lag {lag:.1f}s"
+        )
+        return len(batch)
@@ -0,0 +1,51 @@
+"""Команда полного пересчета предрасчитанных рейтингов."""
+from api.v1.cache import bump_generation
+from django.core.management.base import BaseCommand
+from reviews.models import Ranking, Title
+from reviews.rankings import BOARDS, replace_rankings
+
+
+class Command(BaseCommand):
+    """Команда для пересчета таблицы рейтингов по произведениям"""
+
+    help = "rebuild leaderboards from title counters and recent reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--board",
+            action="append",
+            choices=BOARDS,
+            help="rebuild only the named board (repeatable); run "
+            "--board trending periodically to expire old reviews",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="number of titles recalculated per transaction",
+        )
+
+    def handle(self, *args, **options):
+        boards = options["board"] or BOARDS
+        last_id = 0
+        titles = rows = 0
+        while True:
+            ids = list(
+                Title.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[: options["chunk_size"]]
+            )
+            if not ids:
+                break
+            rows += replace_rankings(ids, boards)
+            last_id = ids[-1]
+            titles += len(ids)
+            self.stdout.write(f"rebuilt {titles} titles", ending="\r")
+        # Строки удаленных жанров и категорий остаются до пересчета.
+        Ranking.objects.filter(board=Ranking.GENRE).exclude(
+            key__in=Title.genre.through.objects.values("genre_id")
+        ).delete()
+        bump_generation("ranking")
+        self.stdout.write(
+            self.style.SUCCESS(f"done: {titles} titles, {rows} rows")
+        )
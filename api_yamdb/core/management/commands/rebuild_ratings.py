@@ -0,0 +1,65 @@
+"""Команда пересчета денормализованного рейтинга произведений."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    """Команда для пересчета rating_sum/rating_count по отзывам"""
+
+    help = "rebuild title rating counters from reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="number of titles recalculated per transaction",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_id = 0
+        rebuilt = 0
+        while True:
+            with transaction.atomic():
+                current = list(
+                    Title.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by("id")
+                    .values_list("id", "rating_sum", "rating_count")[
+                        :chunk_size
+                    ]
+                )
+                if not current:
+                    break
+                ids = [title_id for title_id, _, _ in current]
+                totals = {
+                    row["title_id"]: (row["total"], row["count"])
+                    for row in Review.objects.filter(title_id__in=ids)
+                    .values("title_id")
+                    .annotate(total=Sum("score"), count=Count("id"))
+                    .order_by()
+                }
+                now = timezone.now()
+                titles = []
+                for title_id, rating_sum, rating_count in current:
+                    total, count = totals.get(title_id, (0, 0))
+                    if (total, count) != (rating_sum, rating_count):
+                        titles.append(
+                            Title(
+                                id=title_id,
+                                rating_sum=total,
+                                rating_count=count,
+                                updated=now,
+                            )
+                        )
+                Title.objects.bulk_update(
+                    titles, ["rating_sum", "rating_count", "updated"]
+                )
+            last_id = ids[-1]
+            rebuilt += len(ids)
+            self.stdout.write(f"rebuilt {rebuilt} titles")
+        self.stdout.write(self.style.SUCCESS(f"done: {rebuilt} titles"))
@@ -0,0 +1,92 @@
+"""Метрики запросов в формате Prometheus.
+
+В gunicorn с несколькими воркерами задается PROMETHEUS_MULTIPROC_DIR:
+каждый процесс пишет значения в свои файлы в этом каталоге, а выдача
+метрик собирает их со всех процессов. Отставание очереди писем
+считается по базе в момент выдачи и от процессов не зависит.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .models import OutgoingEmail
+
+LABELS = ("route", "method")
+
+REQUESTS = Counter(
+    "yamdb_http_requests_total",
+    "HTTP requests by route, method and status.",
+    LABELS + ("status",),
+)
+LATENCY = Histogram(
+    "yamdb_http_request_duration_seconds",
+    "Request processing time.",
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    "yamdb_http_response_size_bytes",
+    "Response body size; streamed responses are not counted.",
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+DB_QUERIES = Histogram(
+    "yamdb_db_queries_per_request",
+    "Database queries executed while handling a request.",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_TIME = Histogram(
+    "yamdb_db_time_seconds",
+    "Time spent in database queries per request.",
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+class OutboxLagCollector:
+    """Возраст самого старого неотправленного письма (process_outbox)."""
+
+    name = "yamdb_outbox_queue_lag_seconds"
+    documentation = "Age of the oldest pending email in the outbox."
+
+    def describe(self):
+        return [GaugeMetricFamily(self.name, self.documentation)]
+
+    def collect(self):
+        yield GaugeMetricFamily(
+            self.name,
+            self.documentation,
+            value=OutgoingEmail.objects.queue_lag(),
+        )
+
+
+OUTBOX_LAG = OutboxLagCollector()
+REGISTRY.register(OUTBOX_LAG)
+
+
+def is_multiprocess():
+    return bool(
+        os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        or os.environ.get("prometheus_multiproc_dir")
+    )
+
+
+def render_metrics():
+    """Текст метрик и его Content-Type."""
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(OUTBOX_LAG)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,206 @@
+"""Промежуточные слои проекта."""
+import json
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+from .compression import (
+    ENCODINGS,
+    choose_encoding,
+    has_compressible_type,
+    is_compressible,
+)
+
+INFLIGHT_KEY = "load:inflight:{}"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+KNOWN_METHODS = SAFE_METHODS + ("POST", "PUT", "PATCH", "DELETE")
+
+
+class QueryStats:
+    """Обертка execute_wrapper: число запросов к базе и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Метрики Prometheus по каждому запросу.
+
+    Метки строятся по имени маршрута (titles-list, reviews-detail), а не
+    по пути, чтобы число рядов не росло с числом объектов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def get_labels(request):
+        match = getattr(request, "resolver_match", None)
+        route = match.url_name if match and match.url_name else "unmatched"
+        method = request.method
+        return route, method if method in KNOWN_METHODS else "OTHER"
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        labels = self.get_labels(request)
+        metrics.LATENCY.labels(*labels).observe(
+            time.perf_counter() - started
+        )
+        metrics.REQUESTS.labels(*labels, response.status_code).inc()
+        metrics.DB_QUERIES.labels(*labels).observe(stats.count)
+        metrics.DB_TIME.labels(*labels).observe(stats.duration)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.labels(*labels).observe(
+                len(response.content)
+            )
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Глобальный ограничитель одновременно обрабатываемых запросов.
+
+    Счетчик в общем кеше ведется по окнам LOAD_SHED_WINDOW секунд: запрос
+    учитывается в окне, в котором начался, а в расчет берутся текущее и
+    предыдущее окна. Счетчик меняется только атомарными add/incr/decr,
+    поэтому нужен общий кеш с атомарными операциями (Memcached);
+    FileBasedCache их не гарантирует, а LocMemCache считает запросы
+    каждого процесса отдельно. Счетчик, не уменьшенный упавшим воркером,
+    истекает вместе с окном. Изменяющие запросы отклоняются раньше чтения
+    (LOAD_SHED_MAX_WRITES < LOAD_SHED_MAX_INFLIGHT), чтобы под нагрузкой
+    сохранить каталог доступным.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_limit(self, request):
+        if request.method in SAFE_METHODS:
+            return settings.LOAD_SHED_MAX_INFLIGHT
+        return settings.LOAD_SHED_MAX_WRITES
+
+    def __call__(self, request):
+        limit = self.get_limit(request)
+        if not limit:
+            return self.get_response(request)
+        cache = caches[settings.API_CACHE_ALIAS]
+        window = settings.LOAD_SHED_WINDOW
+        current = int(time.time() // window)
+        key = INFLIGHT_KEY.format(current)
+        # Сначала атомарно занимаем место, затем проверяем лимит: между
+        # проверкой и incr параллельный запрос уже не проскочит.
+        cache.add(key, 0, window * 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, window * 2)
+            count = 1
+        try:
+            if count + cache.get(INFLIGHT_KEY.format(current - 1), 0) > limit:
+                return self.shed()
+            return self.get_response(request)
+        finally:
+            try:
+                cache.decr(key)
+            except ValueError:
+                pass
+
+    def shed(self):
+        """503 с Retry-After: клиент повторит запрос позже."""
+        response = HttpResponse(
+            json.dumps(
+                {"detail": "Сервер перегружен, повторите позже."},
+                ensure_ascii=False,
+            ),
+            status=503,
+            content_type="application/json; charset=utf-8",
+        )
+        response["Retry-After"] = str(settings.LOAD_SHED_RETRY_AFTER)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов gzip или brotli по Accept-Encoding клиента.
+
+    Ответы меньше COMPRESSION_MIN_SIZE отдаются без сжатия. Варианты,
+    сжатые заранее (атрибут compressed_variants у ответа из кеша
+    каталога), повторно не сжимаются.
+
+    Vary и ETag не зависят от размера ответа: ответ 304 по RFC 7232 (4.1)
+    несет те же заголовки, что и 200, а тела, чтобы проверить порог, у
+    него нет. Поэтому ответ текстового типа или 304 всегда получает
+    Vary: Accept-Encoding, а клиенту, принимающему сжатие, отдается
+    слабый ETag, как в GZipMiddleware. Он по-прежнему совпадает в
+    If-None-Match и If-Match.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code != 304 and not has_compressible_type(
+            response
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if encoding is None:
+            return response
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        if (
+            response.status_code != 304
+            and is_compressible(response)
+            and self.compress(response, encoding)
+        ):
+            response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def compress(response, encoding):
+        """Сжимает тело ответа; False, если сжатие не уменьшило его."""
+        compress, compress_sequence = ENCODINGS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content
+            )
+            del response["Content-Length"]
+            return True
+        variants = getattr(response, "compressed_variants", None)
+        if variants is None:
+            content = compress(response.content)
+            if len(content) >= len(response.content):
+                return False
+        elif encoding in variants:
+            content = variants[encoding]
+        else:
+            return False
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        return True
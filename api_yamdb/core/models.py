@@ -1,6 +1,10 @@
-"""Модуль абстрактных моделей."""
+"""Модуль абстрактных моделей и очереди исходящих писем."""
+from datetime import timedelta
+
 from django.core.validators import validate_slug
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 
 class CreatedModel(models.Model):
@@ -22,3 +26,126 @@ class CreatedModel(models.Model):
     class Meta:
         ordering = ["name"]
         abstract = True
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    """Операции с очередью исходящих писем."""
+
+    def enqueue(self, recipient, subject, body, dedupe_key=""):
+        """Ставит письмо в очередь в текущей транзакции.
+
+        Неотправленное письмо с тем же dedupe_key заменяется новым,
+        чтобы повторные запросы не порождали пачку одинаковых писем.
+        """
+        values = {
+            "recipient": recipient,
+            "subject": subject,
+            "body": body,
+            "attempts": 0,
+            "next_attempt_at": timezone.now(),
+            "last_error": "",
+        }
+        if not dedupe_key:
+            return self.create(**values)
+        try:
+            with transaction.atomic():
+                email = self.update_or_create(
+                    dedupe_key=dedupe_key,
+                    status=OutgoingEmail.PENDING,
+                    defaults=values,
+                )[0]
+        except IntegrityError:
+            email = self.get(
+                dedupe_key=dedupe_key, status=OutgoingEmail.PENDING
+            )
+            for field, value in values.items():
+                setattr(email, field, value)
+            email.save()
+        return email
+
+    def due(self):
+        """Письма, которые пора отправить."""
+        return self.filter(
+            status=OutgoingEmail.PENDING, next_attempt_at__lte=timezone.now()
+        ).order_by("next_attempt_at", "id")
+
+    def queue_lag(self):
+        """Возраст самого старого неотправленного письма, в секундах."""
+        oldest = (
+            self.filter(status=OutgoingEmail.PENDING)
+            .order_by("created_at")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if oldest is None:
+            return 0.0
+        return (timezone.now() - oldest).total_seconds()
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (outbox)."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "pending"),
+        (SENT, "sent"),
+        (FAILED, "failed"),
+    )
+
+    recipient = models.EmailField(_("Получатель"), max_length=254)
+    subject = models.CharField(_("Тема"), max_length=255)
+    body = models.TextField(_("Текст"))
+    dedupe_key = models.CharField(
+        _("Ключ дедупликации"), max_length=255, blank=True
+    )
+    status = models.CharField(
+        _("Статус"), max_length=16, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(_("Попытки"), default=0)
+    next_attempt_at = models.DateTimeField(
+        _("Следующая попытка"), default=timezone.now
+    )
+    last_error = models.TextField(_("Последняя ошибка"), blank=True)
+    created_at = models.DateTimeField(_("Создано"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Отправлено"), null=True, blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Исходящее письмо")
+        verbose_name_plural = _("Исходящие письма")
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="outbox_status_next_idx",
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="pending")
+                & ~models.Q(dedupe_key=""),
+                name="unique_pending_email",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
+
+    def mark_sent(self):
+        """Отмечает письмо отправленным."""
+        self.status = self.SENT
+        self.sent_at = timezone.now()
+
+    def mark_failed(self, error, max_attempts, backoff):
+        """Откладывает письмо с экспоненциальной задержкой."""
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= max_attempts:
+            self.status = self.FAILED
+            return
+        delay = backoff * 2 ** (self.attempts - 1)
+        self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
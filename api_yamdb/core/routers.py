@@ -0,0 +1,60 @@
+"""Маршрутизация чтения на реплики базы.
+
+Реплику на время запроса выбирает представление (ReplicaReadMixin),
+роутер только отдает выбранный псевдоним. Запись и все остальное чтение
+идут в основную базу. Реплика, к которой не удалось подключиться,
+исключается из выбора на REPLICA_EJECT_SECONDS в пределах процесса.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+read_alias = ContextVar("read_alias", default=None)
+ejected = {}
+
+
+def eject(alias):
+    """Исключает реплику из выбора на REPLICA_EJECT_SECONDS."""
+    ejected[alias] = time.monotonic() + settings.REPLICA_EJECT_SECONDS
+
+
+def choose_replica():
+    """Взвешенный выбор доступной реплики; None, если таких нет."""
+    now = time.monotonic()
+    replicas = {
+        alias: weight
+        for alias, weight in settings.DATABASE_REPLICAS.items()
+        if ejected.get(alias, 0) <= now
+    }
+    while replicas:
+        alias = random.choices(
+            list(replicas), weights=list(replicas.values())
+        )[0]
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            eject(alias)
+            del replicas[alias]
+        else:
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    """Отдает чтение реплике, выбранной для текущего запроса."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,10 @@
+"""Служебные представления проекта."""
+from django.http import HttpResponse
+
+from .metrics import render_metrics
+
+
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,19 @@
+"""Настройки gunicorn: общий каталог метрик Prometheus для воркеров."""
+import os
+import shutil
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def on_starting(server):
+    """Очищает метрики процессов, оставшиеся от прошлого запуска."""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Убирает значения gauge завершившегося воркера."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_counters(apps, schema_editor):
+    Title = apps.get_model("reviews", "Title")
+    Review = apps.get_model("reviews", "Review")
+    totals = (
+        Review.objects.values("title_id")
+        .annotate(total=Sum("score"), count=Count("id"))
+        .order_by()
+    )
+    for row in totals.iterator():
+        Title.objects.filter(pk=row["title_id"]).update(
+            rating_sum=row["total"], rating_count=row["count"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="title",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="title",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Сумма оценок"
+            ),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
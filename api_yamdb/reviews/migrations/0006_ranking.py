@@ -0,0 +1,80 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0005_title_updated"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ranking",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[
+                            ("overall", "Лучшие"),
+                            ("category", "Лучшие в категории"),
+                            ("genre", "Лучшие в жанре"),
+                            ("trending", "Популярные за период"),
+                        ],
+                        max_length=16,
+                        verbose_name="Рейтинг",
+                    ),
+                ),
+                (
+                    "key",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Категория или жанр"
+                    ),
+                ),
+                (
+                    "score",
+                    models.FloatField(verbose_name="Сглаженная оценка"),
+                ),
+                (
+                    "votes",
+                    models.PositiveIntegerField(
+                        verbose_name="Количество оценок"
+                    ),
+                ),
+                (
+                    "title",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="reviews.Title",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Место в рейтинге",
+                "verbose_name_plural": "Места в рейтингах",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="ranking",
+            index=models.Index(
+                fields=["board", "key", "-score", "title"],
+                name="ranking_board_score_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ranking",
+            constraint=models.UniqueConstraint(
+                fields=("board", "key", "title"), name="unique_ranking"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0006_ranking"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="title",
+            index=models.Index(
+                fields=["name", "year"], name="title_name_year_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="genretitle",
+            index=models.Index(
+                fields=["title", "genre"], name="genretitle_title_genre_idx"
+            ),
+        ),
+    ]
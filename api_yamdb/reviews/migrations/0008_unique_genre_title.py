@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_links(apps, schema_editor):
+    """Оставляет по одной связи жанра с произведением, с наименьшим id."""
+    GenreTitle = apps.get_model("reviews", "GenreTitle")
+    links = GenreTitle.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        links.filter(genre__isnull=False)
+        .values("genre_id", "title_id")
+        .annotate(kept=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for row in list(duplicates):
+        links.filter(
+            genre_id=row["genre_id"], title_id=row["title_id"]
+        ).exclude(id=row["kept"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0007_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_links, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="genretitle",
+            constraint=models.UniqueConstraint(
+                fields=("genre", "title"), name="unique_genre_title"
+            ),
+        ),
+    ]
@@ -3,10 +3,13 @@ from datetime import datetime
 
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Cast, NullIf
 from django.utils.translation import gettext_lazy as _
 from core.models import CreatedModel
 from users.models import User
 
+from .search import search_titles
+
 
 class Category(CreatedModel):
     """Модель для Category. Наследуется из Core."""
@@ -27,6 +30,68 @@ class Genre(CreatedModel):
         verbose_name_plural = _("Жанры")
 
 
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям для выдачи через API."""
+
+    def with_rating(self):
+        """Добавляет средний рейтинг, вычисленный в SQL по счетчикам."""
+        return self.annotate(
+            rating=models.ExpressionWrapper(
+                Cast("rating_sum", models.FloatField())
+                / NullIf("rating_count", 0),
+                output_field=models.FloatField(),
+            )
+        )
+
+    def search(self, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search_titles(self, value)
+
+    def for_catalog(self):
+        """Произведения с категорией, жанрами и рейтингом за O(1) запросов."""
+        return (
+            self.select_related("category")
+            .prefetch_related(
+                models.Prefetch("genre", queryset=Genre.objects.order_by("pk"))
+            )
+            .with_rating()
+        )
+
+    def facets(self):
+        """Число произведений выборки по жанрам, категориям и десятилетиям.
+
+        Каждая группа считается одним запросом с GROUP BY по выборке,
+        переданной подзапросом.
+        """
+        ids = self.order_by().values("id")
+        titles = self.model.objects.filter(id__in=ids)
+        genres = (
+            GenreTitle.objects.filter(title__in=ids, genre__isnull=False)
+            .values(slug=models.F("genre__slug"))
+            # Связь жанра с произведением уникальна, DISTINCT не нужен.
+            .annotate(count=models.Count("title"))
+            .order_by("-count", "slug")
+        )
+        categories = (
+            titles.filter(category__isnull=False)
+            .values(slug=models.F("category__slug"))
+            .annotate(count=models.Count("id"))
+            .order_by("-count", "slug")
+        )
+        decades = list(
+            # Деление целых в SQL отбрасывает остаток: 1987 -> 1980.
+            titles.values(decade=models.F("year") / 10 * 10)
+            .annotate(count=models.Count("id"))
+            .order_by("decade")
+        )
+        return {
+            "count": sum(decade["count"] for decade in decades),
+            "genre": list(genres),
+            "category": list(categories),
+            "decade": decades,
+        }
+
+
 class Title(models.Model):
     """Модель произведения"""
 
@@ -50,6 +115,17 @@ class Title(models.Model):
     )
     genre = models.ManyToManyField(Genre, through="GenreTitle")
     description = models.TextField(_("Описание"), blank=True)
+    rating_sum = models.PositiveIntegerField(
+        _("Сумма оценок"), default=0, editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        _("Количество оценок"), default=0, editable=False
+    )
+    updated = models.DateTimeField(
+        _("Дата изменения"), auto_now=True, db_index=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Произведение")
@@ -60,6 +136,9 @@ class Title(models.Model):
                 fields=["name", "category"], name="unique_name_category"
             )
         ]
+        indexes = [
+            models.Index(fields=["name", "year"], name="title_name_year_idx")
+        ]
 
     def __str__(self):
         return {self.name}
@@ -71,6 +150,18 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.SET_NULL, null=True)
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["genre", "title"], name="unique_genre_title"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["title", "genre"], name="genretitle_title_genre_idx"
+            )
+        ]
+
     def __str__(self):
         return f"{self.genre} {self.title}"
 
@@ -110,6 +201,12 @@ class Review(models.Model):
                 fields=["title", "author"], name="unique_review_title"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["title", "pub_date", "id"],
+                name="review_title_pub_date_idx",
+            )
+        ]
 
     def __str__(self):
         return f"{self.text}"[:15]
@@ -132,6 +229,57 @@ class Comment(models.Model):
     class Meta:
         verbose_name = _("Коментарий")
         verbose_name_plural = _("Коментарии")
+        indexes = [
+            models.Index(
+                fields=["review", "pub_date", "id"],
+                name="comment_review_pub_date_idx",
+            )
+        ]
 
     def __str__(self):
         return f"{self.text}"[:15]
+
+
+class Ranking(models.Model):
+    """Строка предрасчитанного рейтинга произведений.
+
+    Чтение рейтинга - проход по индексу (board, key, -score) без
+    агрегации отзывов. key - id категории или жанра, 0 для общих.
+    """
+
+    OVERALL = "overall"
+    CATEGORY = "category"
+    GENRE = "genre"
+    TRENDING = "trending"
+    BOARDS = (
+        (OVERALL, _("Лучшие")),
+        (CATEGORY, _("Лучшие в категории")),
+        (GENRE, _("Лучшие в жанре")),
+        (TRENDING, _("Популярные за период")),
+    )
+
+    board = models.CharField(_("Рейтинг"), max_length=16, choices=BOARDS)
+    key = models.PositiveIntegerField(_("Категория или жанр"), default=0)
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name="rankings"
+    )
+    score = models.FloatField(_("Сглаженная оценка"))
+    votes = models.PositiveIntegerField(_("Количество оценок"))
+
+    class Meta:
+        verbose_name = _("Место в рейтинге")
+        verbose_name_plural = _("Места в рейтингах")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["board", "key", "title"], name="unique_ranking"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["board", "key", "-score", "title"],
+                name="ranking_board_score_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.board} {self.key} {self.title_id}"
@@ -0,0 +1,99 @@
+"""Модуль предрасчитанных рейтингов произведений.
+
+Оценка - сглаженное среднее (C * m + сумма) / (C + число оценок): пока
+оценок мало, она близка к априорной m и не дает одной десятке обогнать
+произведения с сотнями отзывов. Лучшие в целом, в категории и в жанре
+считаются по счетчикам rating_sum/rating_count, популярные - по отзывам
+за последние LEADERBOARD_TRENDING_DAYS дней с весом ln(1 + число).
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import GenreTitle, Ranking, Review, Title
+
+BOARDS = tuple(board for board, _ in Ranking.BOARDS)
+
+
+def damped_mean(total, count):
+    prior = settings.LEADERBOARD_PRIOR_VOTES
+    return (prior * settings.LEADERBOARD_PRIOR_MEAN + total) / (prior + count)
+
+
+def trending_score(total, count):
+    return damped_mean(total, count) * math.log1p(count)
+
+
+def rating_rows(title_ids):
+    """Строки лучших в целом, в категории и в жанрах по счетчикам."""
+    titles = Title.objects.filter(
+        id__in=title_ids, rating_count__gte=settings.LEADERBOARD_MIN_VOTES
+    ).values_list("id", "category_id", "rating_sum", "rating_count")
+    genres = {}
+    for title_id, genre_id in GenreTitle.objects.filter(
+        title_id__in=title_ids, genre__isnull=False
+    ).values_list("title_id", "genre_id"):
+        genres.setdefault(title_id, set()).add(genre_id)
+    rows = []
+    for title_id, category_id, total, count in titles:
+        score = damped_mean(total, count)
+        keys = [(Ranking.OVERALL, 0)]
+        if category_id is not None:
+            keys.append((Ranking.CATEGORY, category_id))
+        keys.extend(
+            (Ranking.GENRE, genre_id)
+            for genre_id in sorted(genres.get(title_id, ()))
+        )
+        rows.extend(
+            Ranking(
+                board=board,
+                key=key,
+                title_id=title_id,
+                score=score,
+                votes=count,
+            )
+            for board, key in keys
+        )
+    return rows
+
+
+def trending_rows(title_ids):
+    """Строки популярных по отзывам за последние дни."""
+    since = timezone.now() - timedelta(
+        days=settings.LEADERBOARD_TRENDING_DAYS
+    )
+    recent = (
+        Review.objects.filter(title_id__in=title_ids, pub_date__gte=since)
+        .values("title_id")
+        .annotate(total=Sum("score"), count=Count("id"))
+        .order_by()
+    )
+    return [
+        Ranking(
+            board=Ranking.TRENDING,
+            title_id=row["title_id"],
+            score=trending_score(row["total"], row["count"]),
+            votes=row["count"],
+        )
+        for row in recent
+        if row["count"] >= settings.LEADERBOARD_MIN_VOTES
+    ]
+
+
+def replace_rankings(title_ids, boards=BOARDS):
+    """Пересчитывает строки рейтингов произведений в одной транзакции."""
+    rows = []
+    if set(boards) - {Ranking.TRENDING}:
+        rows += [row for row in rating_rows(title_ids) if row.board in boards]
+    if Ranking.TRENDING in boards:
+        rows += trending_rows(title_ids)
+    with transaction.atomic():
+        Ranking.objects.filter(
+            title_id__in=title_ids, board__in=boards
+        ).delete()
+        Ranking.objects.bulk_create(rows)
+    return len(rows)
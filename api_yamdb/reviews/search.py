@@ -0,0 +1,134 @@
+"""Модуль полнотекстового поиска по произведениям.
+
+В PostgreSQL поиск идет по GIN-индексам tsvector и триграмм, в SQLite
+по теневой таблице FTS5, которую поддерживают триггеры. Остальные базы
+получают поиск по вхождению подстроки без ранжирования.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "simple"
+
+POSTGRES_INDEXES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS reviews_title_search_idx "
+    "ON reviews_title USING gin ((to_tsvector('simple'::regconfig, "
+    "COALESCE(name, '') || ' ' || COALESCE(description, ''))))",
+    "CREATE INDEX IF NOT EXISTS reviews_title_name_trgm_idx "
+    "ON reviews_title USING gin (name gin_trgm_ops)",
+)
+
+SQLITE_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5("
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ai "
+    "AFTER INSERT ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ad "
+    "AFTER DELETE ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_au "
+    "AFTER UPDATE OF name, description ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+)
+
+
+def install_search_index(connection):
+    """Создает поисковые индексы; безопасно вызывать повторно.
+
+    В SQLite пересоздание таблицы миграциями удаляет триггеры, поэтому
+    функция вызывается и после каждого migrate.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for statement in POSTGRES_INDEXES:
+                cursor.execute(statement)
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'reviews_title_fts'"
+            )
+            exists = cursor.fetchone() is not None
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if not exists:
+                cursor.execute(
+                    "INSERT INTO reviews_title_fts(reviews_title_fts) "
+                    "VALUES ('rebuild')"
+                )
+
+
+def uninstall_search_index(connection):
+    """Удаляет поисковые индексы."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("DROP INDEX IF EXISTS reviews_title_search_idx")
+            cursor.execute("DROP INDEX IF EXISTS reviews_title_name_trgm_idx")
+        elif connection.vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(
+                    f"DROP TRIGGER IF EXISTS reviews_title_fts_{suffix}"
+                )
+            cursor.execute("DROP TABLE IF EXISTS reviews_title_fts")
+
+
+def _postgres_search(queryset, value):
+    query = SearchQuery(value, config=SEARCH_CONFIG)
+    document = SearchVector("name", "description", config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search_document=document,
+        search_rank=SearchRank(document, query)
+        + TrigramSimilarity("name", value),
+    ).filter(Q(search_document=query) | Q(name__trigram_similar=value))
+
+
+def _sqlite_search(queryset, value):
+    tokens = re.findall(r"\w+", value)
+    if not tokens:
+        return queryset.none()
+    expression = " ".join(f'"{token}"*' for token in tokens)
+    return queryset.annotate(
+        search_rank=RawSQL(
+            "SELECT -bm25(reviews_title_fts, 10.0, 1.0) "
+            "FROM reviews_title_fts WHERE reviews_title_fts MATCH %s "
+            "AND reviews_title_fts.rowid = reviews_title.id",
+            (expression,),
+            output_field=FloatField(),
+        )
+    ).filter(
+        # Условие без имени внешней таблицы работает и в подзапросе.
+        id__in=RawSQL(
+            "SELECT rowid FROM reviews_title_fts "
+            "WHERE reviews_title_fts MATCH %s",
+            (expression,),
+        )
+    )
+
+
+def search_titles(queryset, value):
+    """Фильтрует произведения по запросу и сортирует по релевантности."""
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        queryset = _postgres_search(queryset, value)
+    elif vendor == "sqlite":
+        queryset = _sqlite_search(queryset, value)
+    else:
+        queryset = queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).filter(Q(name__icontains=value) | Q(description__icontains=value))
+    return queryset.order_by("-search_rank", "id")
@@ -0,0 +1,161 @@
+"""Модуль обработчиков сигналов моделей отзывов."""
+from django.db import connections
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Genre, GenreTitle, Review, Title
+from .rankings import replace_rankings
+from .search import install_search_index
+
+
+def apply_rating_delta(title_id, score_delta, count_delta):
+    """Атомарно изменяет счетчики рейтинга произведения на дельту."""
+    if not score_delta and not count_delta:
+        return
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F("rating_sum") + score_delta,
+        rating_count=F("rating_count") + count_delta,
+        updated=timezone.now(),
+    )
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_score(sender, instance, raw=False, using=None, **kwargs):
+    """Читает прежнюю оценку отзыва из базы под блокировкой строки.
+
+    Оценка, загруженная вместе с объектом, могла устареть: параллельный
+    запрос успел ее изменить. Внутри транзакции (update в представлении,
+    админка) второй запрос ждет блокировку и считает дельту от уже новой
+    оценки.
+    """
+    if raw or instance.pk is None:
+        return
+    queryset = Review.objects.using(using).filter(pk=instance.pk)
+    if connections[using].in_atomic_block:
+        queryset = queryset.select_for_update()
+    instance._loaded_score = queryset.values_list("score", flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """Учитывает новый отзыв или изменение оценки в рейтинге."""
+    if raw:
+        return
+    if created:
+        apply_rating_delta(instance.title_id, instance.score, 1)
+    else:
+        previous = getattr(instance, "_loaded_score", None) or 0
+        apply_rating_delta(instance.title_id, instance.score - previous, 0)
+    instance._loaded_score = instance.score
+
+
+@receiver(pre_delete, sender=Review)
+def update_rating_on_delete(sender, instance, using=None, **kwargs):
+    """Исключает удаляемый отзыв из рейтинга произведения.
+
+    Удаление всегда идет в транзакции, поэтому строка блокируется, а
+    оценка читается под блокировкой. Если строки уже нет (объект удален
+    раньше, в том числе параллельным запросом), DELETE ничего не удалит,
+    и рейтинг не меняется. post_delete для этого не годится: он
+    отправляется и тогда, когда DELETE не затронул ни одной строки.
+    """
+    score = (
+        Review.objects.using(using)
+        .select_for_update()
+        .filter(pk=instance.pk)
+        .values_list("score", flat=True)
+        .first()
+    )
+    if score is not None:
+        apply_rating_delta(instance.title_id, -score, -1)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def refresh_title_rankings(sender, instance, raw=False, **kwargs):
+    """Пересчитывает места произведения в рейтингах после изменения."""
+    if not raw:
+        replace_rankings([instance.title_id])
+
+
+@receiver(post_save, sender=Title)
+def refresh_rankings_on_title_save(
+    sender, instance, created, raw=False, **kwargs
+):
+    """Новое произведение без отзывов в рейтинги не попадает."""
+    if not created and not raw:
+        replace_rankings([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def refresh_rankings_on_genres(sender, instance, action, reverse, **kwargs):
+    """Смена жанров меняет набор жанровых рейтингов произведения."""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        replace_rankings([instance.pk])
+    elif kwargs["pk_set"]:
+        replace_rankings(list(kwargs["pk_set"]))
+
+
+def touch_titles(title_ids):
+    """Отмечает произведения измененными для выгрузки по updated_since.
+
+    auto_now срабатывает только в Title.save(), а жанры и категория
+    попадают в выгрузку слагами и меняются в обход него.
+    """
+    Title.objects.filter(pk__in=title_ids).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_title_on_link(sender, instance, raw=False, **kwargs):
+    """Связь с жанром добавлена, изменена или удалена."""
+    if not raw:
+        touch_titles([instance.title_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genres(sender, instance, action, reverse, **kwargs):
+    """Жанры изменены через title.genre или genre.title_set."""
+    if not reverse:
+        if action.startswith("post_"):
+            touch_titles([instance.pk])
+    elif action == "pre_clear":
+        # После clear() связанные произведения уже не найти.
+        touch_titles(instance.title_set.values("pk"))
+    elif action.startswith("post_") and kwargs["pk_set"]:
+        touch_titles(kwargs["pk_set"])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_genre(sender, instance, raw=False, **kwargs):
+    """Слаг жанра в выгрузке изменился или жанр пропадет из нее."""
+    if not raw and not kwargs.get("created"):
+        touch_titles(instance.title_set.values("pk"))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_titles_on_category(sender, instance, raw=False, **kwargs):
+    """Слаг категории в выгрузке изменился или категория пропадет."""
+    if not raw and not kwargs.get("created"):
+        touch_titles(instance.titles.values("pk"))
+
+
+def restore_search_index(sender, using, **kwargs):
+    """Восстанавливает триггеры FTS5, удаленные пересозданием таблицы."""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        install_search_index(connection)
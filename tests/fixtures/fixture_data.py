@@ -0,0 +1,82 @@
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture(autouse=True)
+def clear_api_cache():
+    # Поколения кеша растут после коммита, а тест откатывает транзакцию:
+    # без очистки ответы и счетчики лимитов перешли бы в следующий тест.
+    caches[settings.API_CACHE_ALIAS].clear()
+
+
+def make_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    )
+    return client
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='pass1234'
+    )
+
+
+@pytest.fixture
+def reader(django_user_model):
+    return django_user_model.objects.create_user(
+        username='reader', email='reader@example.com', password='pass1234'
+    )
+
+
+@pytest.fixture
+def administrator(django_user_model):
+    return django_user_model.objects.create_user(
+        username='administrator',
+        email='administrator@example.com',
+        password='pass1234',
+        role='admin',
+    )
+
+
+@pytest.fixture
+def author_client(author):
+    return make_client(author)
+
+
+@pytest.fixture
+def reader_client(reader):
+    return make_client(reader)
+
+
+@pytest.fixture
+def administrator_client(administrator):
+    return make_client(administrator)
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    return [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    title = Title.objects.create(
+        name='Произведение', year=2000, description='', category=category
+    )
+    title.genre.set(genres[:2])
+    return title
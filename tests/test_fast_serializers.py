@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.v1.fastpath import get_fast_serializer
+from api.v1.serializers import (
+    CommentSerializer,
+    ReviewSerializer,
+    TitleSerializer,
+)
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+)
+from users.models import User
+
+SPARSE = [
+    None,
+    ({'id', 'name'}, set()),
+    ({'id', 'genre', 'category'}, set()),
+    ({'id', 'genre', 'category'}, {'genre', 'category'}),
+    ({'name', 'rating', 'description'}, set()),
+]
+AUTHOR_SPARSE = [
+    None,
+    ({'id', 'text'}, set()),
+    ({'id', 'author', 'pub_date'}, {'author'}),
+]
+
+
+def make_titles():
+    categories = [
+        Category(id=1, name='Фильм', slug='movie'),
+        Category(id=2, name='Книга "с кавычками"', slug='book'),
+    ]
+    genres = [
+        Genre(id=number, name=f'Жанр {number}', slug=f'g{number}')
+        for number in range(1, 4)
+    ]
+    titles = []
+    for number in range(1, 8):
+        title = Title(
+            id=number,
+            name=f'Произведение {number} ☃',
+            year=1990 + number,
+            description='' if number % 3 else None,
+            category=categories[number % 2] if number % 4 else None,
+        )
+        title.rating = None if number == 1 else number / 3
+        title._prefetched_objects_cache = {'genre': genres[: number % 4]}
+        titles.append(title)
+    return titles
+
+
+def make_users():
+    return [
+        User(id=1, username='author', first_name='Имя', bio='о себе'),
+        User(id=2, username='critic', last_name='Фамилия'),
+    ]
+
+
+def make_reviews():
+    users = make_users()
+    started = datetime(2024, 2, 29, 23, 59, 59, 123456, tzinfo=timezone.utc)
+    return [
+        Review(
+            id=number,
+            author=users[number % 2],
+            title_id=number % 3 + 1,
+            text=f'Отзыв {number}\n',
+            score=number % 10 + 1,
+            pub_date=started + timedelta(seconds=number, microseconds=-number),
+        )
+        for number in range(1, 9)
+    ]
+
+
+def make_comments():
+    users = make_users()
+    started = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return [
+        Comment(
+            id=number,
+            author=users[number % 2],
+            review_id=number % 4 + 1,
+            text=f'Комментарий {number}',
+            pub_date=started + timedelta(days=number),
+        )
+        for number in range(1, 6)
+    ]
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def assert_parity(serializer_class, objs, sparse):
+    serializer = serializer_class(objs, many=True, context={'sparse': sparse})
+    fast = get_fast_serializer(serializer.child)
+    assert fast is not None, (
+        f'Проверьте, что {serializer_class.__name__} компилируется '
+        'для быстрого пути'
+    )
+    rows, related_rows = fast.rows_from_objects(objs)
+    assert render(fast.build(rows, related_rows)) == render(serializer.data), (
+        'Проверьте, что быстрый путь отдает те же байты, что и DRF'
+    )
+
+
+class TestFastSerializers:
+
+    @pytest.mark.parametrize('sparse', SPARSE)
+    def test_titles(self, sparse):
+        assert_parity(TitleSerializer, make_titles(), sparse)
+
+    @pytest.mark.parametrize('sparse', AUTHOR_SPARSE)
+    def test_reviews(self, sparse):
+        assert_parity(ReviewSerializer, make_reviews(), sparse)
+
+    @pytest.mark.parametrize('sparse', AUTHOR_SPARSE)
+    def test_comments(self, sparse):
+        assert_parity(CommentSerializer, make_comments(), sparse)
+
+    def test_empty_page(self):
+        assert_parity(TitleSerializer, [], None)
+
+    def test_columns(self):
+        fast = get_fast_serializer(TitleSerializer(context={'sparse': None}))
+        assert set(fast.columns) == {
+            'id', 'name', 'year', 'description', 'rating',
+            'category', 'category__name', 'category__slug',
+        }, 'Проверьте, что быстрый путь читает только колонки ответа'
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+        for number in range(4)
+    ]
+    users = [
+        User.objects.create(
+            username=f'user{number}', email=f'user{number}@example.com'
+        )
+        for number in range(3)
+    ]
+    titles = []
+    for number in range(6):
+        title = Title.objects.create(
+            name=f'Произведение {number}',
+            year=2000 + number,
+            description='' if number % 2 else 'Описание',
+            category=None if number == 5 else category,
+        )
+        # Связи в обратном порядке pk жанров: порядок задает запрос.
+        for genre in reversed(genres[: number % 4 + 1]):
+            GenreTitle.objects.create(title=title, genre=genre)
+        titles.append(title)
+    for number, user in enumerate(users):
+        review = Review.objects.create(
+            title=titles[0], author=user, text=f'Отзыв {number}', score=7
+        )
+        for text in ('первый', 'второй'):
+            Comment.objects.create(review=review, author=user, text=text)
+    return titles[0], review
+
+
+def get_list(url, fast):
+    caches[settings.API_CACHE_ALIAS].clear()
+    with override_settings(API_FAST_SERIALIZERS=fast):
+        response = APIClient().get(url)
+    assert response.status_code == 200, response.content
+    return response.content
+
+
+@pytest.mark.django_db
+class TestFastListViews:
+
+    @pytest.mark.parametrize('query', [
+        '?limit=10',
+        '?limit=3&offset=2&ordering=-year',
+        '?limit=10&fields=id,genre,category&expand=genre',
+        '?limit=10&fields=name,rating',
+    ])
+    def test_titles(self, catalog, query):
+        url = f'/api/v1/titles/{query}'
+        assert get_list(url, True) == get_list(url, False), (
+            'Проверьте, что список произведений с API_FAST_SERIALIZERS '
+            'совпадает с обычным побайтно'
+        )
+
+    @pytest.mark.parametrize('query', ['', '?fields=id,author&expand=author'])
+    def test_reviews(self, catalog, query):
+        title, _ = catalog
+        url = f'/api/v1/titles/{title.pk}/reviews/{query}'
+        assert get_list(url, True) == get_list(url, False), (
+            'Проверьте, что список отзывов с API_FAST_SERIALIZERS '
+            'совпадает с обычным побайтно'
+        )
+
+    def test_comments(self, catalog):
+        title, review = catalog
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        assert get_list(url, True) == get_list(url, False), (
+            'Проверьте, что список комментариев с API_FAST_SERIALIZERS '
+            'совпадает с обычным побайтно'
+        )
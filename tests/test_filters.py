@@ -0,0 +1,119 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from reviews.models import Category, Genre, GenreTitle, Title
+
+
+def names(response):
+    assert response.status_code == 200
+    return sorted(item['name'] for item in response.json()['results'])
+
+
+@pytest.fixture
+def titles(category, genres):
+    other = Category.objects.create(name='Книга', slug='book')
+    first = Title.objects.create(
+        name='Первое', year=2001, description='', category=category
+    )
+    first.genre.set(genres[:2])
+    second = Title.objects.create(
+        name='Второе', year=2002, description='', category=other
+    )
+    second.genre.set(genres[1:])
+    third = Title.objects.create(
+        name='Третье', year=2003, description='', category=category
+    )
+    third.genre.set(genres[2:])
+    return first, second, third
+
+
+@pytest.mark.django_db
+class TestTitleFilters:
+
+    def test_genre_any(self, reader_client, titles):
+        response = reader_client.get('/api/v1/titles/?genre=g0,g2')
+        assert names(response) == ['Второе', 'Первое', 'Третье'], (
+            'Проверьте, что по умолчанию подходит любой из жанров'
+        )
+
+    def test_genre_any_without_duplicates(self, reader_client, titles):
+        response = reader_client.get('/api/v1/titles/?genre=g0,g1')
+        assert names(response) == ['Второе', 'Первое'], (
+            'Проверьте, что произведение с несколькими подходящими жанрами '
+            'попадает в выдачу один раз'
+        )
+
+    def test_genre_all(self, reader_client, titles):
+        response = reader_client.get(
+            '/api/v1/titles/?genre=g1,g2&genre_mode=all'
+        )
+        assert names(response) == ['Второе'], (
+            'Проверьте, что genre_mode=all оставляет произведения со всеми '
+            'жанрами'
+        )
+
+    def test_genre_all_duplicate_slugs(self, reader_client, titles):
+        response = reader_client.get(
+            '/api/v1/titles/?genre=g0,g0&genre_mode=all'
+        )
+        assert names(response) == ['Первое'], (
+            'Проверьте, что повторный слаг не требует второй связи с жанром'
+        )
+
+    def test_genre_mode_without_genre(self, reader_client, titles):
+        response = reader_client.get('/api/v1/titles/?genre_mode=all')
+        assert len(names(response)) == 3
+
+    def test_invalid_genre_mode(self, reader_client, titles):
+        response = reader_client.get('/api/v1/titles/?genre=g0&genre_mode=x')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('query', [
+        '?genre=', '?genre=,', '?genre=,&genre_mode=all',
+        '?category=', '?category=,,',
+    ])
+    def test_empty_values(self, reader_client, titles, query):
+        response = reader_client.get(f'/api/v1/titles/{query}')
+        assert len(names(response)) == 3, (
+            'Проверьте, что пустой список слагов не фильтрует выдачу'
+        )
+
+    def test_categories(self, reader_client, titles):
+        response = reader_client.get('/api/v1/titles/?category=movie,book')
+        assert len(names(response)) == 3
+        response = reader_client.get('/api/v1/titles/?category=book,none')
+        assert names(response) == ['Второе'], (
+            'Проверьте, что category принимает слаги через запятую'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_removes_duplicate_links():
+    before = [('reviews', '0007_query_indexes')]
+    after = [('reviews', '0008_unique_genre_title')]
+    executor = MigrationExecutor(connection)
+    executor.migrate(before)
+    apps = executor.loader.project_state(before).apps
+    HistoricalGenre = apps.get_model('reviews', 'Genre')
+    HistoricalTitle = apps.get_model('reviews', 'Title')
+    HistoricalLink = apps.get_model('reviews', 'GenreTitle')
+    genre = HistoricalGenre.objects.create(name='Жанр', slug='genre')
+    other = HistoricalGenre.objects.create(name='Другой', slug='other')
+    title = HistoricalTitle.objects.create(
+        name='Произведение', year=2000, description=''
+    )
+    kept = HistoricalLink.objects.create(genre=genre, title=title)
+    HistoricalLink.objects.create(genre=genre, title=title)
+    HistoricalLink.objects.create(genre=other, title=title)
+
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(after)
+
+    links = GenreTitle.objects.filter(title_id=title.pk)
+    assert sorted(links.values_list('genre_id', flat=True)) == sorted(
+        [genre.pk, other.pk]
+    ), 'Проверьте, что миграция удаляет только повторные связи'
+    assert links.filter(genre_id=genre.pk).get().pk == kept.pk
+    assert Genre.objects.filter(pk=genre.pk).exists()
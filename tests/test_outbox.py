@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from core.metrics import render_metrics
+from core.models import OutgoingEmail
+
+
+def process_outbox():
+    call_command('process_outbox', once=True, stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestProcessOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sends_outside_transaction(self, mailoutbox):
+        for number in range(3):
+            OutgoingEmail.objects.enqueue(
+                f'user{number}@example.com', 'Код', f'код {number}'
+            )
+        in_transaction = []
+        send = EmailBackend.send_messages
+
+        def spy(backend, messages):
+            in_transaction.append(connection.in_atomic_block)
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', spy):
+            process_outbox()
+        assert len(mailoutbox) == 3
+        assert in_transaction == [False] * 3, (
+            'Проверьте, что письма отправляются вне транзакции'
+        )
+        assert not OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING
+        ).exists()
+
+    def test_failed_send_is_retried_later(self):
+        email = OutgoingEmail.objects.enqueue(
+            'user@example.com', 'Код', 'код'
+        )
+        with mock.patch.object(
+            EmailBackend, 'send_messages', side_effect=OSError('нет связи')
+        ):
+            process_outbox()
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert email.last_error == 'нет связи'
+        assert email.next_attempt_at > timezone.now()
+
+    def test_queue_lag_gauge(self):
+        email = OutgoingEmail.objects.enqueue(
+            'user@example.com', 'Код', 'код'
+        )
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            created_at=timezone.now() - timedelta(minutes=2)
+        )
+        content, _ = render_metrics()
+        line = next(
+            line for line in content.decode().splitlines()
+            if line.startswith('yamdb_outbox_queue_lag_seconds ')
+        )
+        assert float(line.split()[1]) >= 120, (
+            'Проверьте, что отставание очереди писем отдается как gauge'
+        )
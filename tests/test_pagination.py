@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reviews.models import Review
+
+STARTED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def reviews(title, django_user_model):
+    reviews = []
+    for number in range(7):
+        user = django_user_model.objects.create_user(
+            username=f'user{number}', email=f'user{number}@example.com'
+        )
+        reviews.append(
+            Review.objects.create(
+                title=title, author=user, text=f'Отзыв {number}', score=5
+            )
+        )
+    # Пары отзывов с одинаковой датой: порядок внутри пары задает id.
+    for number, review in enumerate(reviews):
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=STARTED + timedelta(hours=number // 2)
+        )
+    return sorted(
+        Review.objects.filter(title=title),
+        key=lambda review: (review.pub_date, review.pk),
+        reverse=True,
+    )
+
+
+def get_page(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.content
+    data = response.json()
+    return [item['id'] for item in data['results']], data
+
+
+def make_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_round_trip(self, client, title, reviews):
+        url = f'/api/v1/titles/{title.pk}/reviews/?cursor=&limit=2'
+        seen = []
+        pages = 0
+        while url:
+            ids, data = get_page(client, url)
+            seen.extend(ids)
+            url = data['next']
+            pages += 1
+        assert seen == [review.pk for review in reviews], (
+            'Проверьте, что курсор обходит отзывы по (pub_date, id) без '
+            'пропусков и повторов, в том числе при равных датах'
+        )
+        assert pages == 4
+        assert 'count' not in data
+
+    def test_previous_link(self, client, title, reviews):
+        url = f'/api/v1/titles/{title.pk}/reviews/?cursor=&limit=3'
+        first, data = get_page(client, url)
+        assert data['previous'] is None
+        second, data = get_page(client, data['next'])
+        assert data['previous'] is not None
+        back, data = get_page(client, data['previous'])
+        assert back == first, (
+            'Проверьте, что ссылка previous возвращает предыдущую страницу'
+        )
+        assert data['previous'] is None
+        assert second == [review.pk for review in reviews[3:6]]
+
+    @pytest.mark.parametrize('cursor', [
+        'мусор',
+        '%%%',
+        make_cursor([1, 2]),
+        make_cursor({'d': 'вчера', 'i': 1}),
+        make_cursor({'d': '2024-01-01T00:00:00+00:00'}),
+        make_cursor({'d': '2024-01-01T00:00:00+00:00', 'i': 'x'}),
+        make_cursor({'d': '2024-01-01T00:00:00+00:00', 'i': 10 ** 30}),
+        make_cursor({'d': 5, 'i': 1}),
+    ])
+    def test_malformed_cursor(self, client, title, reviews, cursor):
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/', {'cursor': cursor}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что неверный курсор дает 400'
+        )
+
+    def test_limit_offset_fallback(self, client, title, reviews):
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/?limit=2&offset=2'
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == len(reviews), (
+            'Проверьте, что без cursor используется limit/offset'
+        )
+        assert len(data['results']) == 2
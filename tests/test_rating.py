@@ -0,0 +1,59 @@
+import pytest
+
+from reviews.models import Review, Title
+
+
+def get_counters(title):
+    return Title.objects.values_list('rating_sum', 'rating_count').get(
+        pk=title.pk
+    )
+
+
+@pytest.mark.django_db
+class TestRatingCounters:
+
+    def test_create_and_delete(self, title, author, reader):
+        Review.objects.create(title=title, author=author, text='a', score=4)
+        review = Review.objects.create(
+            title=title, author=reader, text='b', score=8
+        )
+        assert get_counters(title) == (12, 2)
+        review.delete()
+        assert get_counters(title) == (4, 1), (
+            'Проверьте, что удаление отзыва исключает его из рейтинга'
+        )
+
+    def test_delete_twice(self, title, author):
+        Review.objects.create(title=title, author=author, text='a', score=2)
+        first = Review.objects.get(title=title)
+        second = Review.objects.get(title=title)
+        first.delete()
+        second.delete()
+        assert get_counters(title) == (0, 0), (
+            'Проверьте, что удаление уже удаленного отзыва не меняет рейтинг'
+        )
+
+    def test_rescore_stale_copy(self, title, author):
+        Review.objects.create(title=title, author=author, text='a', score=5)
+        first = Review.objects.get(title=title)
+        second = Review.objects.get(title=title)
+        first.score = 8
+        first.save()
+        second.score = 9
+        second.save()
+        assert get_counters(title) == (9, 1), (
+            'Проверьте, что дельта оценки считается от оценки в базе, '
+            'а не от загруженной с объектом'
+        )
+
+    def test_api_rescore_and_delete(self, title, author, author_client):
+        review = Review.objects.create(
+            title=title, author=author, text='a', score=5
+        )
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/'
+        response = author_client.patch(url, {'score': 7}, format='json')
+        assert response.status_code == 200, response.content
+        assert get_counters(title) == (7, 1)
+        assert author_client.delete(url).status_code == 204
+        assert author_client.delete(url).status_code == 404
+        assert get_counters(title) == (0, 0)
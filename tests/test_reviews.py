@@ -0,0 +1,59 @@
+import pytest
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def review(title, author):
+    return Review.objects.create(
+        title=title, author=author, text='Отзыв', score=6
+    )
+
+
+@pytest.mark.django_db
+class TestReviews:
+
+    def test_duplicate_review(self, author_client, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        data = {'text': 'Отзыв', 'score': 7}
+        assert author_client.post(url, data, format='json').status_code == 201
+        response = author_client.post(url, data, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв на произведение дает 400'
+        )
+        assert 'non_field_errors' in response.json()
+        assert Review.objects.filter(title=title).count() == 1
+        assert Title.objects.values_list('rating_count', flat=True).get(
+            pk=title.pk
+        ) == 1
+
+    def test_review_list_queries(
+        self, client, title, review, django_assert_num_queries
+    ):
+        # Произведение, count и страница отзывов с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+
+    def test_comment_list_queries(
+        self, client, title, review, author, django_assert_num_queries
+    ):
+        Comment.objects.create(review=review, author=author, text='Да')
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        # Отзыв вместе с проверкой произведения, count и страница.
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+
+    def test_comment_of_other_title(self, client, review, category):
+        other = Title.objects.create(
+            name='Другое', year=2001, description='', category=category
+        )
+        response = client.get(
+            f'/api/v1/titles/{other.pk}/reviews/{review.pk}/comments/'
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв ищется в произведении из адреса'
+        )
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from api.v1.throttling import ScopeWindowThrottle
+
+
+class View:
+    throttle_scope = 'test'
+
+
+class Request:
+    method = 'GET'
+
+
+def allow(now):
+    throttle = ScopeWindowThrottle()
+    with mock.patch('api.v1.throttling.time.time', return_value=now):
+        return throttle.allow_request(Request, View), throttle.wait()
+
+
+@mock.patch.object(ScopeWindowThrottle, 'THROTTLE_RATES', {'test': '5/min'})
+class TestSlidingWindowThrottle:
+
+    def test_limit_within_window(self):
+        results = [allow(6000.0) for _ in range(6)]
+        assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+        assert results[-1][1] == 60.0, (
+            'Проверьте, что wait() дает время до конца окна'
+        )
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(5):
+            allow(6000.0)
+        # Середина следующего окна: прошлое окно весит половину (2.5).
+        results = [allow(6090.0) for _ in range(3)]
+        assert [allowed for allowed, _ in results] == [True, True, False]
+        assert results[-1][1] == 6.0
+
+    def test_rejected_requests_are_not_counted(self):
+        for _ in range(8):
+            allow(6000.0)
+        assert [allow(6090.0)[0] for _ in range(2)] == [True, True], (
+            'Проверьте, что отклоненные запросы не расходуют лимит'
+        )
@@ -0,0 +1,101 @@
+from unittest import mock
+
+import pytest
+from django.db.models import QuerySet
+
+from reviews.models import GenreTitle, Review, Title
+
+
+@pytest.mark.django_db
+class TestTitleWrites:
+
+    @pytest.mark.parametrize('query', [
+        '?rating_min=1', '?rating_max=10', '?ordering=-rating',
+    ])
+    def test_patch_with_rating_filters(
+        self, administrator_client, title, author, query
+    ):
+        Review.objects.create(title=title, author=author, text='a', score=6)
+        response = administrator_client.patch(
+            f'/api/v1/titles/{title.pk}/{query}',
+            {'name': 'Новое название'},
+            format='json',
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что фильтры по рейтингу не ломают изменение '
+            'произведения'
+        )
+        assert Title.objects.get(pk=title.pk).name == 'Новое название'
+
+
+def insert_concurrently(category):
+    """bulk_create, после которого другой запрос успевает вставить строку."""
+    bulk_create = QuerySet.bulk_create
+
+    def wrapper(queryset, objs, *args, **kwargs):
+        result = bulk_create(queryset, objs, *args, **kwargs)
+        if queryset.model is Title:
+            Title.objects.create(
+                name='Чужое', year=1999, description='', category=category
+            )
+        return result
+
+    return mock.patch.object(QuerySet, 'bulk_create', wrapper)
+
+
+@pytest.mark.django_db
+class TestTitleBulkCreate:
+
+    def test_bulk_create(self, administrator_client, category, genres):
+        payload = [
+            {
+                'name': f'Пакет {number}',
+                'year': 2000 + number,
+                'category': category.slug,
+                'genre': [genre.slug for genre in genres[: number + 1]],
+                'description': '',
+            }
+            for number in range(3)
+        ]
+        with insert_concurrently(category):
+            response = administrator_client.post(
+                '/api/v1/titles/', payload, format='json'
+            )
+        assert response.status_code == 201, response.content
+        for item in response.json():
+            title = Title.objects.get(pk=item['id'])
+            assert title.name == item['name'], (
+                'Проверьте, что пакет отдает id именно созданных строк, '
+                'даже если параллельно вставлены другие'
+            )
+            assert sorted(
+                GenreTitle.objects.filter(title=title).values_list(
+                    'genre__slug', flat=True
+                )
+            ) == sorted(item['genre'])
+
+    @pytest.mark.parametrize('invalid, field', [
+        ({'name': 'Произведение'}, 'non_field_errors'),
+        ({'genre': ['missing']}, 'genre'),
+        ({'category': 'missing'}, 'category'),
+    ])
+    def test_bulk_errors_by_position(
+        self, administrator_client, title, category, genres, invalid, field
+    ):
+        payload = [
+            {'name': f'Новое {number}', 'year': 2001,
+             'category': category.slug, 'genre': [genres[0].slug]}
+            for number in range(3)
+        ]
+        payload[1].update(invalid)
+        response = administrator_client.post(
+            '/api/v1/titles/', payload, format='json'
+        )
+        assert response.status_code == 400
+        errors = response.json()
+        assert len(errors) == 3, (
+            'Проверьте, что ошибки пакета возвращаются списком по позициям'
+        )
+        assert errors[0] == errors[2] == {}
+        assert field in errors[1]
+        assert not Title.objects.filter(name__startswith='Новое').exists()